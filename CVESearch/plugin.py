@@ -28,12 +28,18 @@
 
 ###
 
-from supybot import ircutils, callbacks
+from supybot import conf, ircutils, callbacks, schedule
 from supybot.commands import wrap
 from supybot.i18n import PluginInternationalization
 import re
+import time
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from lxml import html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree, html
 import html as html_parser
 
 _ = PluginInternationalization('CVESearch')
@@ -44,49 +50,196 @@ class CVESearch(callbacks.Plugin):
 
     USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     CVE_PATTERN = re.compile(r'\bCVE-\d{4}-\d{4,7}\b', re.IGNORECASE)
-    URL_PATTERN = re.compile(r'https?://\S+', re.IGNORECASE)
+    # Description, NVD Published and Last Modified dates, all in one tree walk
+    FIELDS_XPATH = etree.XPath('//*[@data-testid="vuln-description"'
+                               ' or @data-testid="vuln-published-on"'
+                               ' or @data-testid="vuln-last-modified-on"]')
+    DESCRIPTION_LABEL = ircutils.bold("Description:")
+    PUBLISHED_LABEL = ircutils.bold("Published Date:")
+    LAST_MODIFIED_LABEL = ircutils.bold("Last Modified Date:")
+    URL_LABEL = ircutils.bold("URL:")
+    TIMEOUT = (3.05, 10)  # (connect, read) in seconds
+    CACHE_TTL = 3600  # How long a successful lookup is reused (in seconds)
+    CACHE_ERROR_TTL = 60  # How long a failed lookup is reused (in seconds)
+    CACHE_SIZE = 512  # Maximum number of cached lookups
+    SNARFER_CACHE_TTL = 60  # How long a channel's cveSnarfer value is reused (in seconds)
+    MAX_SNARFED = 5  # Maximum number of distinct CVEs looked up per message
+    LOOKUP_WORKERS = 4  # Concurrent lookups, each on its own pooled connection
+    CHUNK_SIZE = 16384  # Bytes read from the socket at a time
+    # Comments, processing instructions and the id index are never used by
+    # the XPath queries, so lxml does not need to keep them
+    PARSER_OPTIONS = {'remove_comments': True, 'remove_pis': True, 'collect_ids': False}
+    # data-testid of the NVD page elements we extract; once all of them have
+    # been parsed the rest of the page is not downloaded
+    NVD_FIELDS = ('vuln-description', 'vuln-published-on', 'vuln-last-modified-on')
+
+    def __init__(self, irc):
+        self.__parent = super(CVESearch, self)
+        self.__parent.__init__(irc)
+        self._headers = {'User-Agent': self.USER_AGENT}
+
+        # Keep-alive session so repeated lookups reuse the TLS connection
+        retries = Retry(total=2, backoff_factor=0.2,
+                        status_forcelist=[502, 503, 504], raise_on_status=False)
+        # Every lookup worker, plus the thread running the cve command, can
+        # hold a keep-alive connection to NVD at the same time. A connection
+        # only goes back to the pool once its response has been read to the
+        # end, which _fetch_cve_info makes sure of.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.LOOKUP_WORKERS + 1,
+                              max_retries=retries)
+        self._session = requests.Session()
+        self._session.mount('https://', adapter)
+
+        # Formatted replies keyed by CVE id: {cve_id: (expiry, reply)}.
+        # The lookup workers and the cve command share it, under the lock.
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+        # cveSnarfer values keyed by (channel, network): {key: (expiry, enabled)}.
+        # Changing the global value, or the value an entry was read from,
+        # clears it; the TTL covers changes made anywhere else.
+        self._snarfer_cache = {}
+        self._snarfer_callback = self._snarfer_cache.clear
+        self._snarfer_nodes = {conf.supybot.plugins.CVESearch.cveSnarfer}
+        conf.supybot.plugins.CVESearch.cveSnarfer.addCallback(self._snarfer_callback)
+
+        # Workers for looking up several snarfed CVEs concurrently
+        self._executor = ThreadPoolExecutor(max_workers=self.LOOKUP_WORKERS,
+                                            thread_name_prefix='CVESearch')
+
+    def die(self):
+        for node in self._snarfer_nodes:
+            node.removeCallback(self._snarfer_callback)
+        # Lookups still queued would use the closed session and reply for an
+        # unloaded plugin
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
+        self.__parent.die()
 
     def _get_cve_info(self, cve_id):
-        if not cve_id.upper().startswith('CVE-'):
+        cve_id = cve_id.strip().upper()
+        if not cve_id.startswith('CVE-'):
             cve_id = 'CVE-' + cve_id
 
+        # Don't bother NVD with anything that can't be a CVE id
+        if not self.CVE_PATTERN.fullmatch(cve_id):
+            return ircutils.mircColor(f"Error: {cve_id} is not a valid CVE ID.", 'red')
+
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(cve_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        # Fetched without holding the lock, so lookups still run in parallel
+        reply, found = self._fetch_cve_info(cve_id)
+
+        ttl = self.CACHE_TTL if found else self.CACHE_ERROR_TTL
+        with self._cache_lock:
+            # Make room by dropping expired entries first, then the oldest ones
+            if len(self._cache) >= self.CACHE_SIZE:
+                for key in [k for k, v in self._cache.items() if v[0] <= now]:
+                    del self._cache[key]
+                while len(self._cache) >= self.CACHE_SIZE:
+                    del self._cache[next(iter(self._cache))]
+            self._cache[cve_id] = (now + ttl, reply)
+        return reply
+
+    def _fetch_cve_info(self, cve_id):
+        """Fetches and formats a CVE from NVD.
+
+        Returns a (reply, found) tuple, where found is False for errors and
+        unknown CVEs so that those are cached for a shorter time."""
         url = f"https://nvd.nist.gov/vuln/detail/{cve_id}"
-        headers = {'User-Agent': self.USER_AGENT}
-        response = requests.get(url, headers=headers)
+        try:
+            with self._session.get(url, headers=self._headers, timeout=self.TIMEOUT,
+                                   stream=True) as response:
+                status_code = response.status_code
+                if status_code == 200:
+                    tree = self._parse_nvd_page(response)
+                else:
+                    self._drain(response.iter_content(self.CHUNK_SIZE))
+        except (requests.RequestException, etree.LxmlError) as e:
+            # An empty or broken page fails to parse, like a failed download
+            error_message = f"Error: Unable to fetch information for {cve_id}. {e.__class__.__name__}"
+            return ircutils.mircColor(error_message, 'red'), False
 
-        if response.status_code == 200:
-            tree = html.fromstring(response.content)
+        # Unknown CVEs are answered either with a 404 or with a "does not
+        # exist" page, which the parser recognizes before reaching any field
+        if status_code == 404 or (status_code == 200 and tree is None):
+            return f"Error: {cve_id} does not exist.", False
 
-            # Check if the CVE does not exist
-            if tree.xpath('//h1[text()="This CVE does not exist"]'):
-                return f"Error: {cve_id} does not exist."
+        if status_code == 200:
+            # Group the text of the matched elements by their data-testid
+            fields = {}
+            for element in self.FIELDS_XPATH(tree):
+                text = element.text_content().strip()
+                if text:
+                    fields.setdefault(element.get('data-testid'), []).append(text)
 
             # Extract description information
-            description_elements = tree.xpath('//p[@data-testid="vuln-description"]')
-            description = ''.join([el.text_content().strip() for el in description_elements])
+            description = ''.join(fields.get('vuln-description', ()))
             description = html_parser.unescape(description)  # Convert HTML entities to plain text
 
             # Remove multiple newlines and extra whitespace
-            description = re.sub(r'\s+', ' ', description).strip()
+            description = ' '.join(description.split())
 
-            # Extract NVD Published Date
-            published_date_elements = tree.xpath('//strong[contains(text(),"Published Date:")]/following-sibling::span[@data-testid="vuln-published-on"]//text()')
-            published_date = ' '.join(published_date_elements).strip() if published_date_elements else "N/A"
-            last_modified_elements = tree.xpath('//strong[contains(text(),"Last Modified:")]/following-sibling::span[@data-testid="vuln-last-modified-on"]//text()')
-            last_modified = ' '.join(last_modified_elements).strip() if last_modified_elements else "N/A"
+            # Extract NVD Published and Last Modified dates
+            published_date = ' '.join(fields.get('vuln-published-on', ())) or "N/A"
+            last_modified = ' '.join(fields.get('vuln-last-modified-on', ())) or "N/A"
 
             # Construct the output message with formatting
-            output_lines = [
-                ircutils.mircColor(f"{cve_id}", 'teal') + " - " +
-                f"{ircutils.bold('Description:')} {description}",
-                ircutils.bold("Published Date:") + f" {published_date}",
-                ircutils.bold("Last Modified Date:") + f" {last_modified}",
-                ircutils.bold("URL:") + f" {url}"
-            ]
-            return ' - '.join(output_lines)
+            return (f"{ircutils.mircColor(cve_id, 'teal')} - "
+                    f"{self.DESCRIPTION_LABEL} {description} - "
+                    f"{self.PUBLISHED_LABEL} {published_date} - "
+                    f"{self.LAST_MODIFIED_LABEL} {last_modified} - "
+                    f"{self.URL_LABEL} {url}"), True
+        else:
+            error_message = f"Error: Unable to fetch information for {cve_id}. Status Code: {status_code}"
+            return ircutils.mircColor(error_message, 'red'), False
+
+    def _parse_nvd_page(self, response):
+        """Incrementally parses an NVD detail page, stopping as soon as the
+        fields in NVD_FIELDS have been seen. Returns None without parsing any
+        further if the page says that the CVE does not exist.
+
+        The rest of the page is still read, without being parsed: a response
+        closed with unread data closes its connection instead of handing it
+        back to the pool."""
+        # NVD serves UTF-8 and says so in the Content-Type header; passing the
+        # charset on saves lxml from sniffing the encoding from the bytes.
+        # (requests falls back to ISO-8859-1 when there is no charset at all.)
+        if 'charset' in response.headers.get('Content-Type', ''):
+            encoding = response.encoding
         else:
-            error_message = f"Error: Unable to fetch information for {cve_id}. Status Code: {response.status_code}"
-            return ircutils.mircColor(error_message, 'red')
+            encoding = 'utf-8'
+        parser = etree.HTMLPullParser(events=('end',), encoding=encoding,
+                                      **self.PARSER_OPTIONS)
+        parser.set_element_class_lookup(html.HtmlElementClassLookup())
+        wanted = set(self.NVD_FIELDS)
+        chunks = response.iter_content(self.CHUNK_SIZE)
+        try:
+            for chunk in chunks:
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    if element.tag == 'h1' and element.text == "This CVE does not exist":
+                        return None
+                    wanted.discard(element.get('data-testid'))
+                if not wanted:
+                    break
+            return parser.close()
+        finally:
+            self._drain(chunks)
+
+    def _drain(self, chunks):
+        """Reads what is left of a streamed response, so that its keep-alive
+        connection goes back to the pool. A connection that fails meanwhile
+        is simply closed."""
+        try:
+            for _ in chunks:
+                pass
+        except requests.RequestException:
+            pass
 
     @wrap(["text"])
     def cve(self, irc, msg, args, cve_id):
@@ -94,32 +247,67 @@ class CVESearch(callbacks.Plugin):
         Display information about a CVE (Common Vulnerabilities and Exposures)."""
         irc.reply(self._get_cve_info(cve_id))
 
+    def _snarfer_enabled(self, channel, network):
+        key = (channel, network)
+        now = time.monotonic()
+        cached = self._snarfer_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        node = conf.supybot.plugins.CVESearch.cveSnarfer.getSpecific(network, channel)
+        if node not in self._snarfer_nodes:
+            node.addCallback(self._snarfer_callback)
+            self._snarfer_nodes.add(node)
+        enabled = node()
+        self._snarfer_cache[key] = (now + self.SNARFER_CACHE_TTL, enabled)
+        return enabled
+
     def doPrivmsg(self, irc, msg):
         # Check if the message is sent to a channel
         if not irc.isChannel(msg.channel):
             return
 
-        
+        # Extract the text content from the message
+        text = msg.args[1]
+
+        # Cheap substring checks first, so ordinary chatter never reaches the
+        # registry or the regex engine: the message must mention a CVE
+        # identifier and must not contain a URL (http*)
+        lowered = text.lower()
+        if 'cve-' not in lowered:
+            return
+        if 'http://' in lowered or 'https://' in lowered:
+            return
+
         channel = msg.channel
         network = irc.network
 
         # Check if the cveSnarfer is enabled for this channel and network
-        if not self.registryValue('cveSnarfer', channel, network):
+        if not self._snarfer_enabled(channel, network):
             return
 
-        # Extract the text content from the message
-        text = msg.args[1]
-
         # Ignore any command, no matter the prefix char
         if callbacks.addressed(irc, msg):
             return
 
-        # Check if the message contains a CVE identifier pattern and is not a URL (http*)
-        if not self.URL_PATTERN.search(text):
-            matches = self.CVE_PATTERN.findall(text)
-            for cve_id in matches:
-                irc.reply(self._get_cve_info(cve_id))
+        matches = self.CVE_PATTERN.findall(text)
+        # Look up each distinct CVE once, in parallel and off the main thread,
+        # replying as they complete
+        cve_ids = list(dict.fromkeys(m.upper() for m in matches))[:self.MAX_SNARFED]
+        for cve_id in cve_ids:
+            future = self._executor.submit(self._get_cve_info, cve_id)
+            future.add_done_callback(partial(self._reply_later, irc))
 
+    def _reply_later(self, irc, future):
+        """Hands a finished snarfer lookup back to the main thread, which
+        sends the reply."""
+        if future.cancelled():
+            return
+        try:
+            reply = future.result()
+        except Exception:
+            self.log.exception('CVESearch: snarfer lookup failed')
+            return
+        schedule.addEvent(lambda: irc.reply(reply), time.time())
 
 Class = CVESearch
 
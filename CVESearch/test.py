@@ -29,10 +29,122 @@
 ###
 
 from supybot.test import *
+import io
+import requests
+
+PAGE = b"""<html><head><title>NVD</title></head><body>
+<h2>CVE-2023-1234 Detail</h2>
+<p data-testid="vuln-description">A  buffer overflow
+   in   foo &amp; bar allows   attackers.</p>
+<span data-testid="vuln-published-on">01/02/2023</span>
+<span data-testid="vuln-last-modified-on">03/04/2024</span>
+""" + b"<p>filler</p>" * 5000 + b"</body></html>"
+
+MISSING = (b"<html><body><h1>This CVE does not exist</h1>"
+           + b"<p>filler</p>" * 5000 + b"</body></html>")
 
 
 class CVESearchTestCase(PluginTestCase):
     plugins = ('CVESearch',)
 
+    def _cb(self):
+        return self.irc.getCallback('CVESearch')
+
+    def _serve(self, status_code, body):
+        """Makes NVD answer every request with this page. Returns the list
+        of the responses sent."""
+        responses = []
+
+        def get(url, **kwargs):
+            response = requests.Response()
+            response.url = url
+            response.status_code = status_code
+            response.headers['Content-Type'] = 'text/html; charset=utf-8'
+            response.encoding = 'utf-8'
+            response.raw = io.BytesIO(body)
+            responses.append(response)
+            return response
+
+        self._cb()._session.get = get
+        return responses
+
+    def _stub_fetch(self):
+        """Replaces the NVD lookup. Returns the list of the CVEs looked up."""
+        fetched = []
+
+        def fetch(cve_id):
+            fetched.append(cve_id)
+            return 'info on ' + cve_id, True
+
+        self._cb()._fetch_cve_info = fetch
+        return fetched
+
+    def testInvalidId(self):
+        fetched = self._stub_fetch()
+        self.assertRegexp('cve CVE-abc', 'Error: CVE-ABC is not a valid CVE ID')
+        self.assertEqual(fetched, [])
+
+    def testCache(self):
+        fetched = self._stub_fetch()
+        self.assertResponse('cve CVE-2023-1234', 'info on CVE-2023-1234')
+        self.assertResponse('cve 2023-1234', 'info on CVE-2023-1234')
+        self.assertEqual(fetched, ['CVE-2023-1234'])
+
+        # Expired entries are looked up again
+        cb = self._cb()
+        cb._cache['CVE-2023-1234'] = (0, 'stale')
+        self.assertResponse('cve CVE-2023-1234', 'info on CVE-2023-1234')
+        self.assertEqual(fetched, ['CVE-2023-1234'] * 2)
+
+    def testCacheEviction(self):
+        self._stub_fetch()
+        cb = self._cb()
+        cb.CACHE_SIZE = 3
+        cb._cache.update({
+            'CVE-2000-0001': (0, 'expired'),
+            'CVE-2000-0002': (float('inf'), 'fresh'),
+            'CVE-2000-0003': (0, 'expired'),
+        })
+        self.assertNotError('cve CVE-2023-1234')
+        self.assertEqual(list(cb._cache), ['CVE-2000-0002', 'CVE-2023-1234'])
+
+        # When nothing has expired, the oldest entries go
+        self.assertNotError('cve CVE-2023-5678')
+        self.assertNotError('cve CVE-2023-9012')
+        self.assertEqual(list(cb._cache),
+                         ['CVE-2023-1234', 'CVE-2023-5678', 'CVE-2023-9012'])
+
+    def testPage(self):
+        responses = self._serve(200, PAGE)
+        reply, found = self._cb()._fetch_cve_info('CVE-2023-1234')
+        self.assertTrue(found)
+        self.assertIn('Description: A buffer overflow in foo & bar allows '
+                      'attackers.', ircutils.stripFormatting(reply))
+        self.assertIn('Published Date: 01/02/2023', ircutils.stripFormatting(reply))
+        self.assertIn('Last Modified Date: 03/04/2024', ircutils.stripFormatting(reply))
+        self.assertIn('https://nvd.nist.gov/vuln/detail/CVE-2023-1234', reply)
+        # The parser stops early, but the page is still read to the end
+        self.assertEqual(responses[0].raw.read(), b'')
+
+    def testMissing(self):
+        responses = self._serve(200, MISSING)
+        self.assertEqual(self._cb()._fetch_cve_info('CVE-2023-1234'),
+                         ('Error: CVE-2023-1234 does not exist.', False))
+        self.assertEqual(responses[0].raw.read(), b'')
+
+        self._serve(404, b'Not found')
+        self.assertEqual(self._cb()._fetch_cve_info('CVE-2023-1234'),
+                         ('Error: CVE-2023-1234 does not exist.', False))
+
+    def testErrors(self):
+        self._serve(500, b'Oops')
+        self.assertRegexp('cve CVE-2023-1234', 'Status Code: 500')
+
+        # An empty page can't be parsed
+        self._serve(200, b'')
+        reply, found = self._cb()._fetch_cve_info('CVE-2023-5678')
+        self.assertFalse(found)
+        self.assertIn('XMLSyntaxError', reply)
+
 
 # vim:set shiftwidth=4 tabstop=4 expandtab textwidth=79:
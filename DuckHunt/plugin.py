@@ -37,8 +37,17 @@ import supybot.ircmsgs as ircmsgs
 import supybot.log as log
 import supybot.conf as conf
 from operator import itemgetter
+from collections import Counter
+from random import random as _rand
 
-import threading, random, pickle, os, time, datetime
+import threading, queue, array, random, pickle, mmap, os, sys, time
+
+# Sort keys for (nick, value) pairs: by value, and by value then nick
+BY_VALUE = itemgetter(1)
+BY_VALUE_NICK = itemgetter(1, 0)
+
+# What the bot says when it launches a duck
+QUACK = "🌳🌳🌳 •*´¨`*•.¸¸.•*´¨`*•.¸¸.••*´¨`*•.¸¸ 🦆 QUACK!"
 
 
 class DuckHunt(callbacks.Plugin):
@@ -51,38 +60,13 @@ class DuckHunt(callbacks.Plugin):
 
     threaded = True
 
-    # Those parameters are per-channel parameters
-    started = {}  # Has the hunt started?
-    duck = {}  # Is there currently a duck to shoot?
-    shoots = {}  # Number of successfull shoots in a hunt
-    scores = {}  # Scores for the current hunt
-    times = {}  # Elapsed time since the last duck was launched
-    channelscores = {}  # Saved scores for the channel
-    toptimes = {}  # Times for the current hunt
-    channeltimes = {}  # Saved times for the channel
-    worsttimes = {}  # Worst times for the current hunt
-    channelworsttimes = {}  # Saved worst times for the channel
-    averagetime = {}  # Average shooting time for the current hunt
-    fridayMode = {}  # Are we on friday mode? (automatic)
-    manualFriday = {}  # Are we on friday mode? (manual)
-    missprobability = {}  # Probability to miss a duck when shooting
-    week = {}  # Scores for the week
-    channelweek = {}  # Saved scores for the week
-    leader = {}  # Who is the leader for the week?
-    reloading = {}  # Who is currently reloading?
-    reloadtime = {}  # Time to reload after shooting (in seconds)
-    reloadcount = {}  # Number of shots fired while reloading
-
-    # Does a duck needs to be launched?
-    lastSpoke = {}
-    minthrottle = {}
-    maxthrottle = {}
-    throttle = {}
-
     # Where to save scores?
     fileprefix = "DuckHunt_"
     path = conf.supybot.directories.data
 
+    # How many seconds to wait before writing changed scores to disk?
+    flushdelay = 30
+
     # Enable the 'dbg' command, which launch a duck, if true
     debug = 0
 
@@ -91,9 +75,6 @@ class DuckHunt(callbacks.Plugin):
         5  # How many extra-points are given when someones does a perfect hunt?
     )
     toplist = 15  # How many high{scores|times} are displayed by default?
-    dow = int(time.strftime("%u"))  # Day of week
-    woy = int(time.strftime("%V"))  # Week of year
-    year = time.strftime("%Y")
     dayname = [
         "Monday",
         "Tuesday",
@@ -104,158 +85,493 @@ class DuckHunt(callbacks.Plugin):
         "Sunday",
     ]
 
+    def __init__(self, irc):
+        self.__parent = super(DuckHunt, self)
+        self.__parent.__init__(irc)
+
+        # Those parameters are per-channel parameters
+        self.started = {}  # Has the hunt started?
+        self.duck = {}  # Is there currently a duck to shoot?
+        self.shoots = {}  # Number of successfull shoots in a hunt
+        self.scores = {}  # Scores for the current hunt
+        self.huntleader = {}  # Best (score, nick) of the current hunt, if known
+        self.times = {}  # Elapsed time since the last duck was launched
+        self.channelscores = {}  # Saved scores for the channel
+        self.toptimes = {}  # Times for the current hunt
+        self.channeltimes = {}  # Saved times for the channel
+        self.worsttimes = {}  # Worst times for the current hunt
+        self.channelworsttimes = {}  # Saved worst times for the channel
+        self.averagetime = {}  # Average shooting time for the current hunt
+        self.fridayMode = {}  # Are we on friday mode? (automatic)
+        self.manualFriday = {}  # Are we on friday mode? (manual)
+        self.missprobability = {}  # Probability to miss a duck when shooting
+        self.week = {}  # Scores for the week
+        self.channelweek = {}  # Saved scores for the week
+        self.weekyear = {}  # Which year are the saved week scores from?
+        self.leader = {}  # Who is the leader for the week?
+        self.reloading = {}  # Who is currently reloading?
+        self.reloadtime = {}  # Time to reload after shooting (in seconds)
+        self.reloadcount = {}  # Number of shots fired while reloading
+
+        # Does a duck needs to be launched?
+        self.lastSpoke = {}
+        self.minthrottle = {}
+        self.maxthrottle = {}
+        self.throttle = {}
+        self.launchers = {}  # Launches the next duck when it's time
+
+        # Config values of each channel, cached until they change
+        self.cfgcache = {}
+        self.cfgcallback = self.cfgcache.clear
+        self.cfgnodes = set()
+
+        # Current (second, day of week, week of year, year)
+        self.timecache = None
+
+        # Channels whose saved scores have been read from disk. Once they
+        # are, the tables in memory are the reference, even if empty.
+        self.loaded = set()
+
+        # Sorted scores and times of each channel, kept until they change
+        self.leaderboards = {}
+
+        # Total scores of each week of each channel, kept up to date by
+        # _calc_scores
+        self.weektotals = {}
+
+        # Every change to the state of a channel is made holding its lock
+        self.locks = {}
+
+        # Scores waiting to be written to disk
+        self.dirty = set()  # Which channels need to be written?
+        self.dirtylock = threading.Lock()
+        self.flushpending = False  # Is a write already scheduled?
+
+        # Scores are written by a thread of their own, so the disk never
+        # slows down the game
+        self.writeq = queue.Queue()
+        self.writer = threading.Thread(
+            target=self._writer_loop, name="DuckHunt writer", daemon=True
+        )
+        self.writer.start()
+
+    def _lock(self, channel):
+        """
+        Returns the lock protecting the state of a channel
+        """
+        return self.locks.setdefault(channel, threading.RLock())
+
+    def _cfg_get(self, channel, key, default):
+        """
+        Returns the value of a config variable for a channel, or default if
+        it isn't set
+        """
+        # A config change may clear the cache from another thread at any
+        # time, so look it up only once
+        value = self.cfgcache.get((channel, key))
+        if value is None:
+            node = self.registryValue(key, channel, value=False)
+            if node not in self.cfgnodes:
+                node.addCallback(self.cfgcallback)
+                self.cfgnodes.add(node)
+            value = self.cfgcache[(channel, key)] = node() or default
+        return value
+
+    def _leaderboard(self, channel, name, table, reverse=False):
+        """
+        Returns the (nick, value) pairs of a table of a channel, sorted by
+        value. The sorted list is kept until the scores of the channel change.
+        """
+        leaderboards = self.leaderboards.setdefault(channel, {})
+        if name not in leaderboards:
+            leaderboards[name] = sorted(table.items(), key=BY_VALUE, reverse=reverse)
+        return leaderboards[name]
+
+    def _week_totals(self, channel, week):
+        """
+        Returns the total scores of a week for a channel
+        """
+        weektotals = self.weektotals.setdefault(channel, {})
+        if week not in weektotals:
+            totals = Counter()
+            for players in self.channelweek.get(channel, {}).get(week, {}).values():
+                totals.update(players)
+            weektotals[week] = totals
+        return weektotals[week]
+
+    def _week_summary(self, channel, week):
+        """
+        Returns the winner of each day of a week for a channel, the total
+        scores of the week and its leader. Kept until the scores of the
+        channel change, like the leaderboards.
+        """
+        leaderboards = self.leaderboards.setdefault(channel, {})
+        if ("week", week) not in leaderboards:
+            days = self.channelweek[channel].get(week, {})
+
+            # Winner of each day, as (day, nick, score)
+            winners = []
+            for i, players in sorted(days.items()):
+                if players:
+                    winnernick, winnerscore = max(players.items(), key=BY_VALUE_NICK)
+                    winners.append((i, winnernick, winnerscore))
+
+            totals = self._week_totals(channel, week)
+            leader = None
+            if totals:
+                leader = max(totals.items(), key=BY_VALUE_NICK)
+
+            leaderboards[("week", week)] = (winners, totals, leader)
+        return leaderboards[("week", week)]
+
     def _calc_scores(self, channel):
         """
         Adds new scores and times to the already saved ones
         """
 
-        # scores
-        # Adding current scores to the channel scores
-        for player, value in self.scores[channel].items():
-            if not player in self.channelscores[channel]:
-                # It's a new player
-                self.channelscores[channel][player] = value
-            else:
-                # It's a player that already has a saved score
-                self.channelscores[channel][player] += value
-
-        # times
-        # Adding times scores to the channel scores
-        for player, value in self.toptimes[channel].items():
-            if not player in self.channeltimes[channel]:
-                # It's a new player
-                self.channeltimes[channel][player] = value
-            else:
-                # It's a player that already has a saved score
-                # And we save the time of the current hunt if it's better than it's previous time
-                if self.toptimes[channel][player] < self.channeltimes[channel][player]:
-                    self.channeltimes[channel][player] = self.toptimes[channel][player]
-
-        # worst times
-        # Adding worst times scores to the channel scores
-        for player, value in self.worsttimes[channel].items():
-            if not player in self.channelworsttimes[channel]:
-                # It's a new player
-                self.channelworsttimes[channel][player] = value
-            else:
-                # It's a player that already has a saved score
-                # And we save the time of the current hunt if it's worst than it's previous time
-                if self.worsttimes[channel][player] > value:
-                    self.channelworsttimes[channel][player] = value
-
-        # # week scores
-        # for player, value in self.scores[channel].items():
-        #     # FIXME: If the hunt starts a day and ends the day after, this will produce an error:
-        #     if not player in self.channelweek[channel][self.woy][self.dow]:
-        #         # It's a new player
-        #         self.channelweek[channel][self.woy][self.dow][player] = value
-        #     else:
-        #         # It's a player that already has a saved score
-        #         self.channelweek[channel][self.woy][self.dow][player] += value
-
-        # week scores
-        for player, value in self.scores[channel].items():
-            # Ensure that the channel exists
-            if channel not in self.channelweek:
-                self.channelweek[channel] = {}
-
-            # Ensure that the week of year (self.woy) exists for the channel
-            if self.woy not in self.channelweek[channel]:
-                self.channelweek[channel][self.woy] = {}
-
-            # Ensure that the day of week (self.dow) exists for the week
-            if self.dow not in self.channelweek[channel][self.woy]:
-                self.channelweek[channel][self.woy][self.dow] = {}
-
-            # Now it's safe to check for the player
-            if player not in self.channelweek[channel][self.woy][self.dow]:
-                # It's a new player
-                self.channelweek[channel][self.woy][self.dow][player] = value
-            else:
-                # It's a player that already has a saved score
-                self.channelweek[channel][self.woy][self.dow][player] += value
+        with self._lock(channel):
+            # scores
+            # Adding current scores to the channel scores
+            channelscores = self.channelscores[channel]
+            for player, value in self.scores[channel].items():
+                channelscores[player] = channelscores.get(player, 0) + value
+
+            # times
+            # Keeping the time of the current hunt if it's better than the saved one
+            channeltimes = self.channeltimes[channel]
+            for player, value in self.toptimes[channel].items():
+                if value < channeltimes.get(player, float("inf")):
+                    channeltimes[player] = value
+
+            # worst times
+            # Keeping the time of the current hunt if it's worse than the saved one
+            channelworsttimes = self.channelworsttimes[channel]
+            for player, value in self.worsttimes[channel].items():
+                if value > channelworsttimes.get(player, float("-inf")):
+                    channelworsttimes[player] = value
+
+            # week scores
+            # FIXME: If the hunt starts a day and ends the day after, all the scores go to the second day
+            day, week, year = self._now_dwy()
+            self._check_year(channel, year)
+            dayscores = (
+                self.channelweek.setdefault(channel, {})
+                .setdefault(week, {})
+                .setdefault(day, {})
+            )
+            for player, value in self.scores[channel].items():
+                dayscores[player] = dayscores.get(player, 0) + value
+            if week in self.weektotals.get(channel, {}):
+                self.weektotals[channel][week].update(self.scores[channel])
 
-    def _write_scores(self, channel):
+    def _check_year(self, channel, year):
         """
-        Write scores and times to the disk
+        Starts the week scores of a channel over when a new year begins.
+        The caller must hold the channel lock.
         """
+        if self.weekyear.setdefault(channel, year) != year:
+            self.channelweek.pop(channel, None)
+            self.weektotals.pop(channel, None)
+            self.leaderboards.pop(channel, None)
+            self.leader[channel] = None
+            self.weekyear[channel] = year
 
-        # scores
-        outputfile = open(self.path.dirize(self.fileprefix + channel + ".scores"), "wb")
-        pickle.dump(self.channelscores[channel], outputfile)
-        outputfile.close()
+    def _update_leader(self, channel, nick, score):
+        """
+        Keeps track of who is winning the current hunt after the score of
+        nick changed
+        """
+        if channel not in self.huntleader:
+            # Unknown, _end will look for it
+            return
+        leader = self.huntleader[channel]
+        if leader is not None and leader[1] == nick and score < leader[0]:
+            # The leader lost a point, someone else may be ahead now
+            del self.huntleader[channel]
+        elif leader is None or (score, nick) > leader:
+            self.huntleader[channel] = (score, nick)
+
+    def die(self):
+        # No more ducks
+        for channel in self.launchers:
+            try:
+                schedule.removeEvent("DuckHunt_" + channel)
+            except KeyError:
+                pass
 
-        # times
-        outputfile = open(self.path.dirize(self.fileprefix + channel + ".times"), "wb")
-        pickle.dump(self.channeltimes[channel], outputfile)
-        outputfile.close()
+        # Don't lose the scores that are still waiting to be written
+        with self.dirtylock:
+            if self.flushpending:
+                try:
+                    schedule.removeEvent("DuckHunt_flush")
+                except KeyError:
+                    pass
+        self._flush_all()
+        self.writeq.put(None)
+        self.writer.join()
+        for node in self.cfgnodes:
+            node.removeCallback(self.cfgcallback)
+        self.__parent.die()
+
+    def _mark_dirty(self, channel):
+        """
+        Schedule a write of the scores and times of a channel. Writes are
+        grouped: whatever changes in the next flushdelay seconds is written
+        at once.
+        """
+        # The scores changed, the leaderboards must be sorted again
+        self.leaderboards.pop(channel, None)
 
-        # worst times
-        outputfile = open(
-            self.path.dirize(self.fileprefix + channel + ".worsttimes"), "wb"
-        )
-        pickle.dump(self.channelworsttimes[channel], outputfile)
-        outputfile.close()
+        with self.dirtylock:
+            self.dirty.add(channel)
 
-        # week scores
-        outputfile = open(
-            self.path.dirize(self.fileprefix + channel + self.year + ".weekscores"),
-            "wb",
-        )
-        pickle.dump(self.channelweek[channel], outputfile)
-        outputfile.close()
+            if not self.flushpending:
+                self.flushpending = True
+                schedule.addEvent(
+                    self._flush_all, time.time() + self.flushdelay, "DuckHunt_flush"
+                )
 
-    def _read_scores(self, channel):
+    def _flush_all(self):
+        """
+        Hand a snapshot of every dirty channel over to the writer thread
+        """
+        with self.dirtylock:
+            self.flushpending = False
+            channels = list(self.dirty)
+            self.dirty.clear()
+
+        for channel in channels:
+            with self._lock(channel):
+                state = self._snapshot(channel)
+            self.writeq.put((channel, state))
+
+    def _writer_loop(self):
+        """
+        Write the snapshots from the write queue to the disk, until None is
+        queued
+        """
+        while True:
+            item = self.writeq.get()
+            try:
+                if item is None:
+                    return
+                self._write_scores(*item)
+            except Exception:
+                self.log.exception("Could not write the scores of %s", item[0])
+            finally:
+                self.writeq.task_done()
+
+    def _snapshot(self, channel):
+        """
+        Returns the saved state of a channel, copied so it can be written
+        while the game goes on. The caller must hold the channel lock, so
+        this only copies the tables; packing and pickling are left to the
+        writer thread.
+        """
+        return {
+            "year": self.weekyear.get(channel, self._now_dwy()[2]),
+            "scores": dict(self.channelscores.get(channel, {})),
+            "times": dict(self.channeltimes.get(channel, {})),
+            "worsttimes": dict(self.channelworsttimes.get(channel, {})),
+            "weekscores": {
+                week: {day: dict(players) for day, players in weekdays.items()}
+                for week, weekdays in self.channelweek.get(channel, {}).items()
+            },
+        }
+
+    def _write_scores(self, channel, state):
+        """
+        Write a snapshot of the scores and times to the disk, all in one
+        file. The file is written next to the old one and then renamed over
+        it, so a crash can't leave half-written scores behind.
+        Use _mark_dirty instead of calling this directly.
+        """
+        filename = self.path.dirize(self.fileprefix + channel + ".state")
+        state["packedweekscores"] = self._pack_weekscores(state.pop("weekscores"))
+
+        # A large buffer lets the pickler's many small writes go out in a few
+        # big ones
+        with open(filename + ".tmp", "wb", buffering=1024 * 1024) as outputfile:
+            pickle.dump(state, outputfile, protocol=pickle.HIGHEST_PROTOCOL)
+            outputfile.flush()
+            os.fsync(outputfile.fileno())
+        os.replace(filename + ".tmp", filename)
+
+    def _pack_weekscores(self, weekscores):
+        """
+        Packs week scores into a table of nicks and, for each day, an array
+        of nick indexes and an array of scores. Pickled, that's a lot smaller
+        than the nested dicts.
+        """
+        nicks = {}
+        days = []
+        for week, weekdays in weekscores.items():
+            for day, players in weekdays.items():
+                indexes = [nicks.setdefault(player, len(nicks)) for player in players]
+                days.append((week, day, indexes, array.array("i", players.values())))
+
+        typecode = "H" if len(nicks) <= 0xFFFF else "I"
+        return {
+            "nicks": list(nicks),
+            "days": [
+                (week, day, array.array(typecode, indexes), scores)
+                for week, day, indexes, scores in days
+            ],
+        }
+
+    def _unpack_weekscores(self, packed):
+        """
+        Rebuilds the week scores packed by _pack_weekscores
+        """
+        weekscores = {}
+        nicks = packed["nicks"]
+        for week, day, indexes, scores in packed["days"]:
+            weekscores.setdefault(week, {})[day] = dict(
+                zip(map(nicks.__getitem__, indexes), scores)
+            )
+        return weekscores
+
+    def _load(self, filename):
+        """
+        Unpickles a file, reading it through a memory map
+        """
+        with open(filename, "rb") as inputfile:
+            # Empty files can't be mapped, and hold no pickle anyway
+            if os.fstat(inputfile.fileno()).st_size == 0:
+                raise EOFError("empty file")
+            with mmap.mmap(inputfile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return pickle.load(data)
+
+    def _read_state(self, channel):
         """
-        Reads scores and times from disk
+        Reads the saved state of a channel. Falls back to the files written
+        by older versions, which are picked up by the next write. A damaged
+        state file is renamed to .state.corrupt first, so that the next write
+        doesn't replace it.
         """
         filename = self.path.dirize(self.fileprefix + channel)
-        # scores
-        if not self.channelscores.get(channel):
-            if os.path.isfile(filename + ".scores"):
-                inputfile = open(filename + ".scores", "rb")
-                self.channelscores[channel] = pickle.load(inputfile)
-                inputfile.close()
-
-        # times
-        if not self.channeltimes.get(channel):
-            if os.path.isfile(filename + ".times"):
-                inputfile = open(filename + ".times", "rb")
-                self.channeltimes[channel] = pickle.load(inputfile)
-                inputfile.close()
-
-        # worst times
-        if not self.channelworsttimes.get(channel):
-            if os.path.isfile(filename + ".worsttimes"):
-                inputfile = open(filename + ".worsttimes", "rb")
-                self.channelworsttimes[channel] = pickle.load(inputfile)
-                inputfile.close()
-
-        # week scores
-        if not self.channelweek.get(channel):
-            if os.path.isfile(filename + self.year + ".weekscores"):
-                inputfile = open(filename + self.year + ".weekscores", "rb")
-                self.channelweek[channel] = pickle.load(inputfile)
-                inputfile.close()
+        year = self._now_dwy()[2]
+        try:
+            state = self._load(filename + ".state")
+        except FileNotFoundError:
+            pass
+        except (EOFError, ValueError, pickle.UnpicklingError) as e:
+            self.log.error(
+                "Could not read %s.state, moving it to %s.state.corrupt: %s",
+                filename,
+                filename,
+                e,
+            )
+            try:
+                os.replace(filename + ".state", filename + ".state.corrupt")
+            except FileNotFoundError:
+                # Another thread moved it already
+                pass
+        else:
+            if "packedweekscores" in state:
+                state["weekscores"] = self._unpack_weekscores(
+                    state.pop("packedweekscores")
+                )
+
+            # Week scores start over every year
+            if state["year"] != year:
+                state["weekscores"] = {}
+                state["year"] = year
+            return state
+
+        state = {"year": year}
+        for key, suffix in (
+            ("scores", ".scores"),
+            ("times", ".times"),
+            ("worsttimes", ".worsttimes"),
+            ("weekscores", year + ".weekscores"),
+        ):
+            try:
+                state[key] = self._load(filename + suffix)
+            except FileNotFoundError:
+                pass
+            except (EOFError, ValueError, pickle.UnpicklingError) as e:
+                self.log.error("Could not read %s%s: %s", filename, suffix, e)
+        return state
+
+    def _read_scores(self, channel):
+        """
+        Reads scores and times from disk. The files are read without holding
+        the channel lock, so the game doesn't wait on the disk.
+        """
+        if channel in self.loaded:
+            return
+
+        state = self._read_state(channel)
+
+        with self._lock(channel):
+            # Another thread may have got there first
+            if channel in self.loaded:
+                return
+
+            self.leaderboards.pop(channel, None)
+            self.weektotals.pop(channel, None)
+
+            # scores
+            if not self.channelscores.get(channel) and state.get("scores"):
+                self.channelscores[channel] = state["scores"]
+
+            # times
+            if not self.channeltimes.get(channel) and state.get("times"):
+                self.channeltimes[channel] = state["times"]
+
+            # worst times
+            if not self.channelworsttimes.get(channel) and state.get("worsttimes"):
+                self.channelworsttimes[channel] = state["worsttimes"]
+
+            # week scores
+            if not self.channelweek.get(channel) and state.get("weekscores"):
+                self.channelweek[channel] = state["weekscores"]
+            self.weekyear.setdefault(channel, state.get("year", self._now_dwy()[2]))
+
+            self.loaded.add(channel)
+
+    def _hms(self, seconds):
+        """
+        Formats a duration like str(datetime.timedelta) does, to the second
+        """
+        minutes, seconds = divmod(round(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        days, hours = divmod(hours, 24)
+        hms = "%d:%02d:%02d" % (hours, minutes, seconds)
+        if days:
+            return "%d day%s, %s" % (days, "s" if days != 1 else "", hms)
+        return hms
+
+    def _now_dwy(self):
+        """
+        Returns the current day of week, week of year and year. They are
+        only computed again when the second changes.
+        """
+        now = int(time.time())
+        if self.timecache is None or self.timecache[0] != now:
+            localtime = time.localtime(now)
+            self.timecache = (
+                now,
+                int(time.strftime("%u", localtime)),  # Day of week
+                int(time.strftime("%V", localtime)),  # Week of year
+                time.strftime("%Y", localtime),
+            )
+        return self.timecache[1:]
 
     def _initdayweekyear(self, channel):
-        self.dow = int(time.strftime("%u"))  # Day of week
-        self.woy = int(time.strftime("%V"))  # Week of year
-        year = time.strftime("%Y")
+        """
+        Makes sure there are week scores for today, and returns the current
+        day of week and week of year
+        """
+        day, week, year = self._now_dwy()
+        self._check_year(channel, year)
 
         # Init week scores
-        try:
-            self.channelweek[channel]
-        except:
-            self.channelweek[channel] = {}
-        try:
-            self.channelweek[channel][self.woy]
-        except:
-            self.channelweek[channel][self.woy] = {}
-        try:
-            self.channelweek[channel][self.woy][self.dow]
-        except:
-            self.channelweek[channel][self.woy][self.dow] = {}
+        self.channelweek.setdefault(channel, {}).setdefault(week, {}).setdefault(
+            day, {}
+        )
+        return day, week
 
     def _initthrottle(self, irc, msg, args, channel):
 
@@ -271,7 +587,7 @@ class DuckHunt(callbacks.Plugin):
         if not self.manualFriday.get(channel):
             self.manualFriday[channel] = False
 
-        if self.registryValue("autoFriday", channel) == True:
+        if self._cfg_get(channel, "autoFriday", False) == True:
             if (
                 int(time.strftime("%w")) == 5
                 and int(time.strftime("%H")) > 8
@@ -282,30 +598,15 @@ class DuckHunt(callbacks.Plugin):
                 self.fridayMode[channel] = False
 
         # Miss probability
-        if self.registryValue("missProbability", channel):
-            self.missprobability[channel] = self.registryValue(
-                "missProbability", channel
-            )
-        else:
-            self.missprobability[channel] = 0.2
+        self.missprobability[channel] = self._cfg_get(channel, "missProbability", 0.2)
 
         # Reload time
-        if self.registryValue("reloadTime", channel):
-            self.reloadtime[channel] = self.registryValue("reloadTime", channel)
-        else:
-            self.reloadtime[channel] = 5
+        self.reloadtime[channel] = self._cfg_get(channel, "reloadTime", 5)
 
         if self.fridayMode[channel] == False and self.manualFriday[channel] == False:
             # Init min throttle[currentChannel] and max throttle[currentChannel]
-            if self.registryValue("minthrottle", channel):
-                self.minthrottle[channel] = self.registryValue("minthrottle", channel)
-            else:
-                self.minthrottle[channel] = 30
-
-            if self.registryValue("maxthrottle", channel):
-                self.maxthrottle[channel] = self.registryValue("maxthrottle", channel)
-            else:
-                self.maxthrottle[channel] = 300
+            self.minthrottle[channel] = self._cfg_get(channel, "minthrottle", 30)
+            self.maxthrottle[channel] = self._cfg_get(channel, "maxthrottle", 300)
 
         else:
             self.minthrottle[channel] = 3
@@ -322,86 +623,65 @@ class DuckHunt(callbacks.Plugin):
 
         currentChannel = msg.args[0]
         if irc.isChannel(currentChannel):
+            # First of all, let's read the score if needed
+            self._read_scores(currentChannel)
 
-            if self.started.get(currentChannel) == True:
-                irc.reply("✔️ There is already a hunt right now!")
-            else:
-
-                # First of all, let's read the score if needed
-                self._read_scores(currentChannel)
+            with self._lock(currentChannel):
+                if self.started.get(currentChannel) == True:
+                    irc.reply("✔️ There is already a hunt right now!")
+                else:
 
-                self._initthrottle(irc, msg, args, currentChannel)
+                    self._initthrottle(irc, msg, args, currentChannel)
 
-                # Init saved scores
-                try:
-                    self.channelscores[currentChannel]
-                except:
-                    self.channelscores[currentChannel] = {}
+                    # Init saved scores
+                    self.channelscores.setdefault(currentChannel, {})
 
-                # Init saved times
-                try:
-                    self.channeltimes[currentChannel]
-                except:
-                    self.channeltimes[currentChannel] = {}
+                    # Init saved times
+                    self.channeltimes.setdefault(currentChannel, {})
 
-                # Init saved times
-                try:
-                    self.channelworsttimes[currentChannel]
-                except:
-                    self.channelworsttimes[currentChannel] = {}
+                    # Init saved worst times
+                    self.channelworsttimes.setdefault(currentChannel, {})
 
-                # Init times
-                self.toptimes[currentChannel] = {}
-                self.worsttimes[currentChannel] = {}
+                    # Init times
+                    self.toptimes[currentChannel] = {}
+                    self.worsttimes[currentChannel] = {}
 
-                # Init bangdelay
-                self.times[currentChannel] = False
+                    # Init bangdelay
+                    self.times[currentChannel] = False
 
-                # Init lastSpoke
-                self.lastSpoke[currentChannel] = time.time()
+                    # Init lastSpoke
+                    self.lastSpoke[currentChannel] = time.time()
 
-                # Reinit current hunt scores
-                if self.scores.get(currentChannel):
+                    # Reinit current hunt scores
                     self.scores[currentChannel] = {}
+                    self.huntleader[currentChannel] = None
 
-                # Reinit reloading
-                self.reloading[currentChannel] = {}
-
-                # Reinit reloadcount
-                self.reloadcount[currentChannel] = {}
+                    # Reinit reloading
+                    self.reloading[currentChannel] = {}
 
-                # No duck launched
-                self.duck[currentChannel] = False
+                    # Reinit reloadcount
+                    self.reloadcount[currentChannel] = {}
 
-                # Hunt started
-                self.started[currentChannel] = True
+                    # No duck launched
+                    self.duck[currentChannel] = False
 
-                # Init shoots
-                self.shoots[currentChannel] = 0
+                    # Hunt started
+                    self.started[currentChannel] = True
 
-                # Init averagetime
-                self.averagetime[currentChannel] = 0
+                    # Init shoots
+                    self.shoots[currentChannel] = 0
 
-                # Init schedule
-
-                # First of all, stop the scheduler if it was still running
-                try:
-                    schedule.removeEvent("DuckHunt_" + currentChannel)
-                except KeyError:
-                    pass
+                    # Init averagetime
+                    self.averagetime[currentChannel] = 0
 
-                # Then restart it
-                def myEventCaller():
-                    self._launchEvent(irc, msg)
+                    # Init schedule
+                    def myEventCaller():
+                        self._launchEvent(irc, msg)
 
-                try:
-                    schedule.addPeriodicEvent(
-                        myEventCaller, 5, "DuckHunt_" + currentChannel, False
-                    )
-                except AssertionError:
-                    pass
+                    self.launchers[currentChannel] = myEventCaller
+                    self._schedule_launch(currentChannel)
 
-                irc.reply("✔️ The hunt starts now! 🦆🦆🦆", prefixNick=False)
+                    irc.reply("✔️ The hunt starts now! 🦆🦆🦆", prefixNick=False)
         else:
             irc.error("You have to be on a channel")
 
@@ -409,15 +689,35 @@ class DuckHunt(callbacks.Plugin):
 
     def _launchEvent(self, irc, msg):
         currentChannel = msg.args[0]
-        now = time.time()
         if irc.isChannel(currentChannel):
-            if self.started.get(currentChannel) == True:
-                if self.duck[currentChannel] == False:
-                    if (
-                        now
-                        > self.lastSpoke[currentChannel] + self.throttle[currentChannel]
-                    ):
-                        self._launch(irc, msg, "")
+            with self._lock(currentChannel):
+                now = time.time()
+                if self.started.get(currentChannel) == True:
+                    if self.duck[currentChannel] == False:
+                        if (
+                            now
+                            > self.lastSpoke[currentChannel] + self.throttle[currentChannel]
+                        ):
+                            self._launch(irc, msg, "")
+                        else:
+                            self._schedule_launch(currentChannel)
+
+    def _schedule_launch(self, channel):
+        """
+        Schedules the launch of the next duck, if the hunt is on and there's
+        no duck right now
+        """
+        try:
+            schedule.removeEvent("DuckHunt_" + channel)
+        except KeyError:
+            pass
+
+        if self.started.get(channel) == True and self.duck[channel] == False:
+            schedule.addEvent(
+                self.launchers[channel],
+                self.lastSpoke[channel] + self.throttle[channel],
+                "DuckHunt_" + channel,
+            )
 
     def stophunt(self, irc, msg, args):
         """
@@ -426,16 +726,15 @@ class DuckHunt(callbacks.Plugin):
 
         currentChannel = msg.args[0]
         if irc.isChannel(currentChannel):
-            if self.started.get(currentChannel) == True:
-                self._end(irc, msg, args)
-            else:
-                irc.reply("❗ Nothing to stop: there's no hunt right now.")
-            # If someone uses the stop command,
-            # we stop the scheduler, even if autoRestart is enabled
-            try:
-                schedule.removeEvent("DuckHunt_" + currentChannel)
-            except:
-                pass
+            with self._lock(currentChannel):
+                if self.started.get(currentChannel) == True:
+                    self._end(irc, msg, args)
+                else:
+                    irc.reply("❗ Nothing to stop: there's no hunt right now.")
+                # If someone uses the stop command,
+                # we stop the scheduler, even if autoRestart is enabled:
+                # the hunt is over, so this only removes the next launch
+                self._schedule_launch(currentChannel)
         else:
             irc.error("You have to be on a channel")
 
@@ -447,34 +746,37 @@ class DuckHunt(callbacks.Plugin):
         Enable/disable friday mode! (there are lots of ducks on friday :))
         """
         if irc.isChannel(channel):
-
-            if status == "status":
-                irc.reply(
-                    "Manual friday mode for "
-                    + channel
-                    + " is "
-                    + str(self.manualFriday.get(channel))
-                )
-                irc.reply(
-                    "Auto friday mode for "
-                    + channel
-                    + " is "
-                    + str(self.fridayMode.get(channel))
-                )
-            else:
-                if (
-                    self.manualFriday.get(channel) == None
-                    or self.manualFriday[channel] == False
-                ):
-                    self.manualFriday[channel] = True
+            with self._lock(channel):
+                if status == "status":
+                    irc.reply(
+                        "Manual friday mode for "
+                        + channel
+                        + " is "
+                        + str(self.manualFriday.get(channel))
+                    )
                     irc.reply(
-                        "Friday mode is now enabled! Shoot alllllllllllll the ducks!"
+                        "Auto friday mode for "
+                        + channel
+                        + " is "
+                        + str(self.fridayMode.get(channel))
                     )
                 else:
-                    self.manualFriday[channel] = False
-                    irc.reply("Friday mode is now disabled.")
+                    if (
+                        self.manualFriday.get(channel) == None
+                        or self.manualFriday[channel] == False
+                    ):
+                        self.manualFriday[channel] = True
+                        irc.reply(
+                            "Friday mode is now enabled! Shoot alllllllllllll the ducks!"
+                        )
+                    else:
+                        self.manualFriday[channel] = False
+                        irc.reply("Friday mode is now disabled.")
 
-            self._initthrottle(irc, msg, args, channel)
+                self._initthrottle(irc, msg, args, channel)
+
+                # The throttle changed, so does the time of the next duck
+                self._schedule_launch(channel)
         else:
             irc.error("You have to be on a channel")
 
@@ -516,15 +818,12 @@ class DuckHunt(callbacks.Plugin):
         currentChannel = msg.args[0]
         if irc.isChannel(currentChannel):
             self._read_scores(currentChannel)
-            try:
-                self.channelscores[currentChannel]
-            except:
-                self.channelscores[currentChannel] = {}
-
-            try:
-                irc.reply(self.channelscores[currentChannel][nick])
-            except:
-                irc.reply("There is no score for %s on %s" % (nick, currentChannel))
+            with self._lock(currentChannel):
+                score = self.channelscores.get(currentChannel, {}).get(nick)
+                if score is None:
+                    irc.reply("There is no score for %s on %s" % (nick, currentChannel))
+                else:
+                    irc.reply(score)
         else:
             irc.error("You have to be on a channel")
 
@@ -537,40 +836,26 @@ class DuckHunt(callbacks.Plugin):
         """
         if irc.isChannel(channel):
             self._read_scores(channel)
-
-            # Total scores
-            try:
-                self.channelscores[channel][nickto] += self.channelscores[channel][
-                    nickfrom
-                ]
-                del self.channelscores[channel][nickfrom]
-                self._write_scores(channel)
-                irc.reply("Total scores merged")
-
-            except:
-                irc.error("Can't merge total scores")
-
-            # Day scores
-            try:
-                self._initdayweekyear(channel)
-                day = self.dow
-                week = self.woy
-
-                try:
-                    self.channelweek[channel][week][day][nickto] += self.channelweek[
-                        channel
-                    ][week][day][nickfrom]
-                except:
-                    self.channelweek[channel][week][day][nickto] = self.channelweek[
-                        channel
-                    ][week][day][nickfrom]
-
-                del self.channelweek[channel][week][day][nickfrom]
-                self._write_scores(channel)
-                irc.reply("Day scores merged")
-
-            except:
-                irc.error("Can't merge day scores")
+            with self._lock(channel):
+                # Total scores
+                scores = self.channelscores.get(channel, {})
+                if nickfrom in scores:
+                    scores[nickto] = scores.get(nickto, 0) + scores.pop(nickfrom)
+                    self._mark_dirty(channel)
+                    irc.reply("Total scores merged")
+                else:
+                    irc.error("Can't merge total scores")
+
+                # Day scores
+                day, week = self._initdayweekyear(channel)
+                dayscores = self.channelweek[channel][week][day]
+                if nickfrom in dayscores:
+                    dayscores[nickto] = dayscores.get(nickto, 0) + dayscores.pop(nickfrom)
+                    self.weektotals.get(channel, {}).pop(week, None)
+                    self._mark_dirty(channel)
+                    irc.reply("Day scores merged")
+                else:
+                    irc.error("Can't merge day scores")
 
         else:
             irc.error("You have to be on a channel")
@@ -583,35 +868,28 @@ class DuckHunt(callbacks.Plugin):
         nickto gets the best time of nickfrom if nickfrom time is better than nickto time, and nickfrom is removed from the timelist. Also works with worst times.
         """
         if irc.isChannel(channel):
-            try:
-                self._read_scores(channel)
+            self._read_scores(channel)
+            with self._lock(channel):
+                times = self.channeltimes.get(channel, {})
+                worsttimes = self.channelworsttimes.get(channel, {})
 
-                # Merge best times
-                if (
-                    self.channeltimes[channel][nickfrom]
-                    < self.channeltimes[channel][nickto]
-                ):
-                    self.channeltimes[channel][nickto] = self.channeltimes[channel][
-                        nickfrom
-                    ]
-                del self.channeltimes[channel][nickfrom]
+                if nickfrom in times and nickfrom in worsttimes:
+                    # Merge best times
+                    besttime = times.pop(nickfrom)
+                    if besttime < times.get(nickto, float("inf")):
+                        times[nickto] = besttime
 
-                # Merge worst times
-                if (
-                    self.channelworsttimes[channel][nickfrom]
-                    > self.channelworsttimes[channel][nickto]
-                ):
-                    self.channelworsttimes[channel][nickto] = self.channelworsttimes[
-                        channel
-                    ][nickfrom]
-                del self.channelworsttimes[channel][nickfrom]
+                    # Merge worst times
+                    worsttime = worsttimes.pop(nickfrom)
+                    if worsttime > worsttimes.get(nickto, float("-inf")):
+                        worsttimes[nickto] = worsttime
 
-                self._write_scores(channel)
+                    self._mark_dirty(channel)
 
-                irc.replySuccess()
+                    irc.replySuccess()
 
-            except:
-                irc.replyError()
+                else:
+                    irc.error("There are no times for %s on %s" % (nickfrom, channel))
 
         else:
             irc.error("You have to be on a channel")
@@ -625,9 +903,12 @@ class DuckHunt(callbacks.Plugin):
         """
         if irc.isChannel(channel):
             self._read_scores(channel)
-            del self.channeltimes[channel][nick]
-            self._write_scores(channel)
-            irc.replySuccess()
+            with self._lock(channel):
+                if self.channeltimes.get(channel, {}).pop(nick, None) is not None:
+                    self._mark_dirty(channel)
+                    irc.replySuccess()
+                else:
+                    irc.error("There is no best time for %s on %s" % (nick, channel))
 
         else:
             irc.error("Are you sure " + str(channel) + " is a channel?")
@@ -640,14 +921,13 @@ class DuckHunt(callbacks.Plugin):
         Remove <nick>'s score
         """
         if irc.isChannel(channel):
-            try:
-                self._read_scores(channel)
-                del self.channelscores[channel][nick]
-                self._write_scores(channel)
-                irc.replySuccess()
-
-            except:
-                irc.replyError()
+            self._read_scores(channel)
+            with self._lock(channel):
+                if self.channelscores.get(channel, {}).pop(nick, None) is not None:
+                    self._mark_dirty(channel)
+                    irc.replySuccess()
+                else:
+                    irc.error("There is no score for %s on %s" % (nick, channel))
 
         else:
             irc.error("Are you sure this is a channel?")
@@ -661,36 +941,36 @@ class DuckHunt(callbacks.Plugin):
         """
 
         if irc.isChannel(channel):
-
             self._read_scores(channel)
-            self._initdayweekyear(channel)
-            day = self.dow
-            week = self.woy
-
-            if self.channelweek.get(channel):
-                if self.channelweek[channel].get(week):
-                    if self.channelweek[channel][week].get(day):
-                        # Getting all scores, to get the winner of the week
-                        msgstring = ""
-                        scores = sorted(
-                            iter(self.channelweek[channel][week][day].items()),
-                            key=itemgetter(1),
-                            reverse=True,
-                        )
-                        for item in scores:
-                            msgstring += "({0}: {1}) ".format(item[0], str(item[1]))
+            with self._lock(channel):
+                day, week = self._initdayweekyear(channel)
 
-                        if msgstring != "":
-                            irc.reply("Scores for today:")
-                            irc.reply(msgstring)
+                if self.channelweek.get(channel):
+                    if self.channelweek[channel].get(week):
+                        if self.channelweek[channel][week].get(day):
+                            # Getting all scores, to get the winner of the week
+                            scores = self._leaderboard(
+                                channel,
+                                (week, day),
+                                self.channelweek[channel][week][day],
+                                reverse=True,
+                            )
+                            msgstring = "".join(
+                                "({0}: {1}) ".format(item[0], str(item[1]))
+                                for item in scores
+                            )
+
+                            if msgstring != "":
+                                irc.reply("Scores for today:")
+                                irc.reply(msgstring)
+                            else:
+                                irc.reply("❗ There aren't any day scores for today yet.")
                         else:
                             irc.reply("❗ There aren't any day scores for today yet.")
                     else:
                         irc.reply("❗ There aren't any day scores for today yet.")
                 else:
-                    irc.reply("❗ There aren't any day scores for today yet.")
-            else:
-                irc.reply("❗ There aren't any day scores for this channel yet.")
+                    irc.reply("❗ There aren't any day scores for this channel yet.")
         else:
             irc.reply("Are you sure this is a channel?")
 
@@ -703,79 +983,62 @@ class DuckHunt(callbacks.Plugin):
         """
 
         if irc.isChannel(channel):
-
             self._read_scores(channel)
-            weekscores = {}
-
-            if not week:
-                week = self.woy
-
-            if self.channelweek.get(channel):
-                if self.channelweek[channel].get(week):
-                    # Showing the winner for each day
-                    if not nick:
-                        msgstring = ""
-                        # for each day of week
-                        for i in (1, 2, 3, 4, 5, 6, 7):
-                            if self.channelweek[channel][week].get(i):
-                                # Getting winner of the day
-                                winnernick, winnerscore = max(
-                                    iter(self.channelweek[channel][week][i].items()),
-                                    key=lambda k_v: (k_v[1], k_v[0]),
-                                )
-                                msgstring += "{0}: ({1}: {2}) ".format(
+            with self._lock(channel):
+                day, thisweek, year = self._now_dwy()
+                self._check_year(channel, year)
+                if not week:
+                    week = thisweek
+
+                if self.channelweek.get(channel):
+                    if self.channelweek[channel].get(week):
+                        # Showing the winner for each day
+                        if not nick:
+                            winners, totals, leader = self._week_summary(channel, week)
+                            # for each day of week
+                            msgstring = "".join(
+                                "{0}: ({1}: {2}) ".format(
                                     self.dayname[i - 1], winnernick, str(winnerscore)
                                 )
-
-                        # Getting all scores, to get the winner of the week
-                        for i, players in self.channelweek[channel][week].items():
-                            for player, value in players.items():
-                                weekscores.setdefault(player, 0)
-                                weekscores[player] += value
-
-                        if msgstring != "":
-                            irc.reply("Scores for week " + str(week) + ":")
-                            irc.reply(msgstring)
-                            # Who's the winner at this point?
-                            winnernick, winnerscore = max(
-                                iter(weekscores.items()),
-                                key=lambda k_v1: (k_v1[1], k_v1[0]),
-                            )
-                            irc.reply(
-                                "🏆 Leader: %s with %i points."
-                                % (winnernick, winnerscore)
+                                for i, winnernick, winnerscore in winners
                             )
 
+                            if msgstring != "":
+                                irc.reply("Scores for week " + str(week) + ":")
+                                irc.reply(msgstring)
+                                # Who's the winner at this point?
+                                winnernick, winnerscore = leader
+                                irc.reply(
+                                    "🏆 Leader: %s with %i points."
+                                    % (winnernick, winnerscore)
+                                )
+
+                            else:
+                                irc.reply("❗ There aren't any week scores for this week yet.")
                         else:
-                            irc.reply("❗ There aren't any week scores for this week yet.")
-                    else:
-                        # Showing the scores of <nick>
-                        msgstring = ""
-                        total = 0
-                        for i in (1, 2, 3, 4, 5, 6, 7):
-                            if self.channelweek[channel][week].get(i):
-                                if self.channelweek[channel][week][i].get(nick):
-                                    msgstring += "({0}: {1}) ".format(
-                                        self.dayname[i - 1],
-                                        str(
-                                            self.channelweek[channel][week][i].get(nick)
-                                        ),
-                                    )
-                                    total += self.channelweek[channel][week][i].get(
-                                        nick
+                            # Showing the scores of <nick>
+                            parts = []
+                            total = 0
+                            for i, players in sorted(self.channelweek[channel][week].items()):
+                                score = players.get(nick)
+                                if score:
+                                    parts.append(
+                                        "({0}: {1}) ".format(self.dayname[i - 1], str(score))
                                     )
+                                    total += score
+                            msgstring = "".join(parts)
 
-                        if msgstring != "":
-                            irc.reply(nick + " scores for week " + str(self.woy) + ":")
-                            irc.reply(msgstring)
-                            irc.reply("Total: " + str(total) + " points.")
-                        else:
-                            irc.reply("❗ There aren't any week scores for this nick.")
+                            if msgstring != "":
+                                irc.reply(nick + " scores for week " + str(self._now_dwy()[1]) + ":")
+                                irc.reply(msgstring)
+                                irc.reply("Total: " + str(total) + " points.")
+                            else:
+                                irc.reply("❗ There aren't any week scores for this nick.")
 
+                    else:
+                        irc.reply("❗ There aren't any week scores for this week yet.")
                 else:
-                    irc.reply("❗ There aren't any week scores for this week yet.")
-            else:
-                irc.reply("❗ There aren't any week scores for this channel yet.")
+                    irc.reply("❗ There aren't any week scores for this channel yet.")
         else:
             irc.reply("❗ Are you sure this is a channel?")
 
@@ -788,43 +1051,37 @@ class DuckHunt(callbacks.Plugin):
         """
 
         if irc.isChannel(channel):
-            try:
-                self.channelscores[channel]
-            except:
-                self.channelscores[channel] = {}
-
             self._read_scores(channel)
+            with self._lock(channel):
+                self.channelscores.setdefault(channel, {})
 
-            # How many results do we display?
-            if not size:
-                listsize = self.toplist
-            else:
-                listsize = size
+                # How many results do we display?
+                if not size:
+                    listsize = self.toplist
+                else:
+                    listsize = size
 
-            # Sort the scores (reversed: the higher the better)
-            scores = sorted(
-                iter(self.channelscores[channel].items()),
-                key=itemgetter(1),
-                reverse=True,
-            )
-            del scores[listsize:]
+                # Get the best scores (the higher the better)
+                scores = self._leaderboard(
+                    channel, "scores", self.channelscores[channel], reverse=True
+                )[:listsize]
 
-            msgstring = ""
-            for item in scores:
                 # Why do we show the nicks as xnickx?
                 # Just to prevent everyone that has ever played a hunt in the channel to be pinged every time anyone asks for the score list
-                msgstring += "({0}: {1}) ".format(item[0], str(item[1]))
-            if msgstring != "":
-                irc.reply(
-                    "🦆 ~ DuckHunt top-"
-                    + str(listsize)
-                    + " scores 🏆🏆🏆 for "
-                    + channel
-                    + " ~ 🦆"
+                msgstring = "".join(
+                    "({0}: {1}) ".format(item[0], str(item[1])) for item in scores
                 )
-                irc.reply(msgstring)
-            else:
-                irc.reply("There aren't any scores for this channel yet.")
+                if msgstring != "":
+                    irc.reply(
+                        "🦆 ~ DuckHunt top-"
+                        + str(listsize)
+                        + " scores 🏆🏆🏆 for "
+                        + channel
+                        + " ~ 🦆"
+                    )
+                    irc.reply(msgstring)
+                else:
+                    irc.reply("There aren't any scores for this channel yet.")
         else:
             irc.reply("Are you sure this is a channel?")
 
@@ -837,14 +1094,13 @@ class DuckHunt(callbacks.Plugin):
 
         if irc.isChannel(channel):
             self._read_scores(channel)
-            if self.channelscores.get(channel):
-                scores = self.channelscores[channel]
-                total = 0
-                for player, value in scores.items():
-                    total += value
-                irc.reply(str(total) + " 🦆 ducks have been shot in " + channel + "!")
-            else:
-                irc.reply("There are no scores for this channel yet")
+            with self._lock(channel):
+                scores = self.channelscores.get(channel)
+                if scores:
+                    total = sum(scores.values())
+                    irc.reply(str(total) + " 🦆 ducks have been shot in " + channel + "!")
+                else:
+                    irc.reply("There are no scores for this channel yet")
 
         else:
             irc.reply("Are you sure this is a channel?")
@@ -859,73 +1115,62 @@ class DuckHunt(callbacks.Plugin):
 
         if irc.isChannel(channel):
             self._read_scores(channel)
+            with self._lock(channel):
+                self.channeltimes.setdefault(channel, {})
+                self.channelworsttimes.setdefault(channel, {})
 
-            try:
-                self.channeltimes[channel]
-            except:
-                self.channeltimes[channel] = {}
-
-            try:
-                self.channelworsttimes[channel]
-            except:
-                self.channelworsttimes[channel] = {}
-
-            # How many results do we display?
-            if not size:
-                listsize = self.toplist
-            else:
-                listsize = size
+                # How many results do we display?
+                if not size:
+                    listsize = self.toplist
+                else:
+                    listsize = size
 
-            # Sort the times (not reversed: the lower the better)
-            times = sorted(
-                iter(self.channeltimes[channel].items()),
-                key=itemgetter(1),
-                reverse=False,
-            )
-            del times[listsize:]
+                # Get the best times (the lower the better)
+                times = self._leaderboard(
+                    channel, "times", self.channeltimes[channel]
+                )[:listsize]
 
-            msgstring = ""
-            for item in times:
                 # Same as in listscores for the xnickx
                 # msgstring += "x" + item[0] + "x: "+ str(round(item[1],2)) + " | "
-                msgstring += "({0}: {1}) ".format(item[0], str(round(item[1], 2)))
-            if msgstring != "":
-                irc.reply(
-                    "🦆 ~ DuckHunt top-"
-                    + str(listsize)
-                    + " fastest times 🕒 for "
-                    + channel
-                    + " ~ 🦆"
+                msgstring = "".join(
+                    "({0}: {1}) ".format(item[0], str(round(item[1], 2)))
+                    for item in times
                 )
-                irc.reply(msgstring)
-            else:
-                irc.reply("There aren't any best times for this channel yet.")
+                if msgstring != "":
+                    irc.reply(
+                        "🦆 ~ DuckHunt top-"
+                        + str(listsize)
+                        + " fastest times 🕒 for "
+                        + channel
+                        + " ~ 🦆"
+                    )
+                    irc.reply(msgstring)
+                else:
+                    irc.reply("There aren't any best times for this channel yet.")
 
-            times = sorted(
-                iter(self.channelworsttimes[channel].items()),
-                key=itemgetter(1),
-                reverse=True,
-            )
-            del times[listsize:]
+                times = self._leaderboard(
+                    channel, "worsttimes", self.channelworsttimes[channel], reverse=True
+                )[:listsize]
 
-            msgstring = ""
-            for item in times:
                 # Same as in listscores for the xnickx
                 # msgstring += "x" + item[0] + "x: "+ time.strftime('%H:%M:%S', time.gmtime(item[1])) + ", "
-                roundseconds = round(item[1])
-                delta = datetime.timedelta(seconds=roundseconds)
-                msgstring += "({0}: {1}) ".format(item[0], str(delta))
-            if msgstring != "":
-                irc.reply(
-                    "🦆 ~ DuckHunt top-"
-                    + str(listsize)
-                    + " longest times 🕒 for "
-                    + channel
-                    + " ~ 🦆"
+                msgstring = "".join(
+                    "({0}: {1}) ".format(
+                        item[0], self._hms(item[1])
+                    )
+                    for item in times
                 )
-                irc.reply(msgstring)
-            else:
-                irc.reply("❗ There aren't any longest times for this channel yet.")
+                if msgstring != "":
+                    irc.reply(
+                        "🦆 ~ DuckHunt top-"
+                        + str(listsize)
+                        + " longest times 🕒 for "
+                        + channel
+                        + " ~ 🦆"
+                    )
+                    irc.reply(msgstring)
+                else:
+                    irc.reply("❗ There aren't any longest times for this channel yet.")
 
         else:
             irc.reply("Are you sure this is a channel?")
@@ -939,7 +1184,8 @@ class DuckHunt(callbacks.Plugin):
         currentChannel = msg.args[0]
         if self.debug:
             if irc.isChannel(currentChannel):
-                self._launch(irc, msg, "")
+                with self._lock(currentChannel):
+                    self._launch(irc, msg, "")
 
     dbg = wrap(dbg)
 
@@ -949,198 +1195,162 @@ class DuckHunt(callbacks.Plugin):
         """
         currentChannel = msg.args[0]
 
+        # The nick is a key of most of the tables, make them all share the
+        # same string
+        nick = sys.intern(msg.nick)
+
         if irc.isChannel(currentChannel):
-            if self.started.get(currentChannel) == True:
+            with self._lock(currentChannel):
+                if self.started.get(currentChannel) == True:
+                    now = time.time()
+
+                    # The tables of this channel
+                    scores = self.scores.setdefault(currentChannel, {})
+                    reloading = self.reloading[currentChannel]
+                    reloadcount = self.reloadcount[currentChannel]
+                    reloadtime = self.reloadtime[currentChannel]
+                    missprobability = self.missprobability[currentChannel]
+
+                    # Channel settings used below
+                    kickMode = self._cfg_get(currentChannel, "kickMode", False)
+                    # Can we kick the players who shoot at nothing?
+                    kick = (
+                        kickMode and irc.nick in irc.state.channels[currentChannel].ops
+                    )
+                    maxShoots = self._cfg_get(currentChannel, "ducks", 10)
 
-                # bangdelay: how much time between the duck was launched and this shot?
-                if self.times[currentChannel]:
-                    bangdelay = time.time() - self.times[currentChannel]
-                else:
-                    bangdelay = False
+                    # bangdelay: how much time between the duck was launched and this shot?
+                    if self.times[currentChannel]:
+                        bangdelay = now - self.times[currentChannel]
+                    else:
+                        bangdelay = False
 
-                # Is the player reloading?
-                if (
-                    self.reloading[currentChannel].get(msg.nick)
-                    and time.time() - self.reloading[currentChannel][msg.nick]
-                    < self.reloadtime[currentChannel]
-                    and self.reloadcount[currentChannel][msg.nick] < 1
-                ):
-                    irc.reply(
-                        "⏳ ▄︻デ══━一 You are reloading... (Reloading takes %i seconds)"
-                        % (self.reloadtime[currentChannel])
-                    )
-                    self.reloadcount[currentChannel][msg.nick] += 1
-                    return 0
-                if (
-                    self.reloading[currentChannel].get(msg.nick)
-                    and time.time() - self.reloading[currentChannel][msg.nick]
-                    < self.reloadtime[currentChannel]
-                    and self.reloadcount[currentChannel][msg.nick] > 0
-                ):
-                    try:
-                        self.scores[currentChannel][msg.nick] -= 1
-                    except:
-                        try:
-                            self.scores[currentChannel][msg.nick] = -1
-                        except:
-                            self.scores[currentChannel] = {}
-                            self.scores[currentChannel][msg.nick] = -1
-
-                    # Base message
-                    message = "❌ You shot yourself while trying to reload! ▄︻デ══━一💥"
-
-                    # Adding additional message if kick
-                    if (
-                        self.registryValue("kickMode", currentChannel)
-                        and irc.nick in irc.state.channels[currentChannel].ops
-                    ):
-                        message += (
-                            "⏳ Reloading takes %s seconds."
-                            % self.reloadtime[currentChannel]
-                        )
+                    # Is the player reloading?
+                    reloadstart = reloading.get(nick)
+                    if reloadstart and now - reloadstart < reloadtime:
+                        if reloadcount[nick] < 1:
+                            irc.reply(
+                                "⏳ ▄︻デ══━一 You are reloading... (Reloading takes %i seconds)"
+                                % (reloadtime)
+                            )
+                            reloadcount[nick] += 1
+                            return 0
 
-                    # Adding nick and score
-                    message += " %s: %i" % (
-                        msg.nick,
-                        self.scores[currentChannel][msg.nick],
-                    )
+                        scores[nick] = scores.get(nick, 0) - 1
+                        self._update_leader(currentChannel, nick, scores[nick])
 
-                    # If we were able to have a bangdelay (ie: a duck was launched before someone did bang)
-                    if bangdelay:
-                        # Adding time
-                        message += " (" + str(round(bangdelay, 2)) + " seconds)"
+                        # Base message
+                        message = "❌ You shot yourself while trying to reload! ▄︻デ══━一💥"
 
-                    # If kickMode is enabled for this channel, and the bot have op capability, let's kick!
-                    if (
-                        self.registryValue("kickMode", currentChannel)
-                        and irc.nick in irc.state.channels[currentChannel].ops
-                    ):
-                        irc.queueMsg(ircmsgs.kick(currentChannel, msg.nick, message))
-                    else:
-                        # Else, just say it
-                        irc.reply(message)
-                    return 0
+                        # Adding additional message if kick
+                        if kick:
+                            message += "⏳ Reloading takes %s seconds." % reloadtime
 
-                # This player is now reloading
-                self.reloading[currentChannel][msg.nick] = time.time()
-                self.reloadcount[currentChannel][msg.nick] = 0
+                        # Adding nick and score
+                        message += " %s: %i" % (nick, scores[nick])
 
-                # There was a duck
-                if self.duck[currentChannel] == True:
+                        # If we were able to have a bangdelay (ie: a duck was launched before someone did bang)
+                        if bangdelay:
+                            # Adding time
+                            message += " (" + str(round(bangdelay, 2)) + " seconds)"
 
-                    # Did the player missed it?
-                    if random.random() < self.missprobability[currentChannel]:
-                        irc.reply("❌ You missed the duck! ❌")
-                    else:
+                        # If kickMode is enabled for this channel, and the bot have op capability, let's kick!
+                        if kick:
+                            irc.queueMsg(ircmsgs.kick(currentChannel, nick, message))
+                        else:
+                            # Else, just say it
+                            irc.reply(message)
+                        return 0
 
-                        # Adds one point for the nick that shot the duck
-                        try:
-                            self.scores[currentChannel][msg.nick] += 1
-                        except:
-                            try:
-                                self.scores[currentChannel][msg.nick] = 1
-                            except:
-                                self.scores[currentChannel] = {}
-                                self.scores[currentChannel][msg.nick] = 1
+                    # This player is now reloading
+                    reloading[nick] = now
+                    reloadcount[nick] = 0
 
-                        irc.reply(
-                            "🦆✔️ | Score: %i (%.2f seconds )"
-                            % (self.scores[currentChannel][msg.nick], bangdelay)
-                        )
+                    # There was a duck
+                    if self.duck[currentChannel] == True:
+
+                        # Did the player missed it?
+                        if _rand() < missprobability:
+                            irc.reply("❌ You missed the duck! ❌")
+                        else:
 
-                        self.averagetime[currentChannel] += bangdelay
+                            # Adds one point for the nick that shot the duck
+                            scores[nick] = scores.get(nick, 0) + 1
+                            self._update_leader(currentChannel, nick, scores[nick])
 
-                        # Now save the bang delay for the player (if it's quicker than it's previous bangdelay)
-                        try:
-                            previoustime = self.toptimes[currentChannel][msg.nick]
-                            if bangdelay < previoustime:
-                                self.toptimes[currentChannel][msg.nick] = bangdelay
-                        except:
-                            self.toptimes[currentChannel][msg.nick] = bangdelay
+                            irc.reply(
+                                "🦆✔️ | Score: %i (%.2f seconds )"
+                                % (scores[nick], bangdelay)
+                            )
 
-                        # Now save the bang delay for the player (if it's worst than it's previous bangdelay)
-                        try:
-                            previoustime = self.worsttimes[currentChannel][msg.nick]
-                            if bangdelay > previoustime:
-                                self.worsttimes[currentChannel][msg.nick] = bangdelay
-                        except:
-                            self.worsttimes[currentChannel][msg.nick] = bangdelay
+                            self.averagetime[currentChannel] += bangdelay
 
-                        self.duck[currentChannel] = False
+                            # Now save the bang delay for the player (if it's quicker than it's previous bangdelay)
+                            toptimes = self.toptimes[currentChannel]
+                            if bangdelay < toptimes.get(nick, float("inf")):
+                                toptimes[nick] = bangdelay
 
-                        # Reset the basetime for the waiting time before the next duck
-                        self.lastSpoke[currentChannel] = time.time()
+                            # Now save the bang delay for the player (if it's worst than it's previous bangdelay)
+                            worsttimes = self.worsttimes[currentChannel]
+                            if bangdelay > worsttimes.get(nick, float("-inf")):
+                                worsttimes[nick] = bangdelay
 
-                        if self.registryValue("ducks", currentChannel):
-                            maxShoots = self.registryValue("ducks", currentChannel)
-                        else:
-                            maxShoots = 10
-
-                        # End of Hunt
-                        if self.shoots[currentChannel] == maxShoots:
-                            self._end(irc, msg, args)
-
-                            # If autorestart is enabled, we restart a hunt automatically!
-                            if self.registryValue("autoRestart", currentChannel):
-                                # This code shouldn't be here
-                                self.started[currentChannel] = True
-                                self._initthrottle(irc, msg, args, currentChannel)
-                                if self.scores.get(currentChannel):
+                            self.duck[currentChannel] = False
+
+                            # Reset the basetime for the waiting time before the next duck
+                            self.lastSpoke[currentChannel] = now
+
+                            # End of Hunt
+                            if self.shoots[currentChannel] == maxShoots:
+                                self._end(irc, msg, args)
+
+                                # If autorestart is enabled, we restart a hunt automatically!
+                                if self._cfg_get(currentChannel, "autoRestart", False):
+                                    # This code shouldn't be here
+                                    self.started[currentChannel] = True
+                                    self._initthrottle(irc, msg, args, currentChannel)
                                     self.scores[currentChannel] = {}
-                                if self.reloading.get(currentChannel):
                                     self.reloading[currentChannel] = {}
 
-                                self.averagetime[currentChannel] = 0
+                                    self.averagetime[currentChannel] = 0
 
-                # There was no duck or the duck has already been shot
-                else:
+                            # Wait for the next duck
+                            self._schedule_launch(currentChannel)
 
-                    # Removes one point for the nick that shot
-                    try:
-                        self.scores[currentChannel][msg.nick] -= 1
-                    except:
-                        try:
-                            self.scores[currentChannel][msg.nick] = -1
-                        except:
-                            self.scores[currentChannel] = {}
-                            self.scores[currentChannel][msg.nick] = -1
+                    # There was no duck or the duck has already been shot
+                    else:
 
-                    # Base message
-                    message = "❌ There was no duck! ❌"
+                        # Removes one point for the nick that shot
+                        scores[nick] = scores.get(nick, 0) - 1
+                        self._update_leader(currentChannel, nick, scores[nick])
 
-                    # Adding additional message if kick
-                    if (
-                        self.registryValue("kickMode", currentChannel)
-                        and irc.nick in irc.state.channels[currentChannel].ops
-                    ):
-                        message += "❌ You just shot yourself! ▄︻デ══━一💥"
+                        # Base message
+                        message = "❌ There was no duck! ❌"
 
-                    # Adding nick and score
-                    message += " %s: %i" % (
-                        msg.nick,
-                        self.scores[currentChannel][msg.nick],
-                    )
+                        # Adding additional message if kick
+                        if kick:
+                            message += "❌ You just shot yourself! ▄︻デ══━一💥"
 
-                    # If we were able to have a bangdelay (ie: a duck was launched before someone did bang)
-                    if bangdelay:
-                        # Adding time
-                        message += " (" + str(round(bangdelay, 2)) + " seconds)"
+                        # Adding nick and score
+                        message += " %s: %i" % (nick, scores[nick])
 
-                    # If kickMode is enabled for this channel, and the bot have op capability, let's kick!
-                    if (
-                        self.registryValue("kickMode", currentChannel)
-                        and irc.nick in irc.state.channels[currentChannel].ops
-                    ):
-                        irc.queueMsg(ircmsgs.kick(currentChannel, msg.nick, message))
-                    else:
-                        # Else, just say it
-                        irc.reply(message)
+                        # If we were able to have a bangdelay (ie: a duck was launched before someone did bang)
+                        if bangdelay:
+                            # Adding time
+                            message += " (" + str(round(bangdelay, 2)) + " seconds)"
 
-            else:
-                irc.reply(
-                    "❗ There is no hunt right now! You can start a hunt with the 'starthunt'"
-                    " command"
-                )
+                        # If kickMode is enabled for this channel, and the bot have op capability, let's kick!
+                        if kick:
+                            irc.queueMsg(ircmsgs.kick(currentChannel, nick, message))
+                        else:
+                            # Else, just say it
+                            irc.reply(message)
+
+                else:
+                    irc.reply(
+                        "❗ There is no hunt right now! You can start a hunt with the 'starthunt'"
+                        " command"
+                    )
         else:
             irc.error("You have to be on a channel ❗")
 
@@ -1148,12 +1358,14 @@ class DuckHunt(callbacks.Plugin):
 
     def doPrivmsg(self, irc, msg):
         currentChannel = msg.args[0]
-        if irc.isChannel(msg.args[0]):
-            if msg.args[1] == "🌳🌳🌳 •*´¨`*•.¸¸.•*´¨`*•.¸¸.••*´¨`*•.¸¸ 🦆 QUACK!":
+        # This runs for every message, compare the text first: it is cheaper
+        # than isChannel and almost never matches
+        if msg.args[1] == QUACK:
+            if irc.isChannel(currentChannel):
                 message = msg.nick + ", don't pretend to be me!"
                 # If kickMode is enabled for this channel, and the bot have op capability, let's kick!
                 if (
-                    self.registryValue("kickMode", currentChannel)
+                    self._cfg_get(currentChannel, "kickMode", False)
                     and irc.nick in irc.state.channels[currentChannel].ops
                 ):
                     irc.queueMsg(ircmsgs.kick(currentChannel, msg.nick, message))
@@ -1171,27 +1383,27 @@ class DuckHunt(callbacks.Plugin):
         # End the hunt
         self.started[currentChannel] = False
 
-        try:
-            self.channelscores[currentChannel]
-        except:
-            self.channelscores[currentChannel] = {}
+        self.channelscores.setdefault(currentChannel, {})
+
+        autoRestart = self._cfg_get(currentChannel, "autoRestart", False)
+        maxShoots = self._cfg_get(currentChannel, "ducks", 10)
 
-        if not self.registryValue("autoRestart", currentChannel):
+        if not autoRestart:
             irc.reply("❗ The hunt stops now! ❗", prefixNick=False)
 
         # Showing scores
-        if self.scores.get(currentChannel):
+        scores = self.scores.get(currentChannel)
+        if scores:
 
             # Getting winner
-            winnernick, winnerscore = max(
-                iter(self.scores.get(currentChannel).items()),
-                key=lambda k_v12: (k_v12[1], k_v12[0]),
-            )
-            if self.registryValue("ducks", currentChannel):
-                maxShoots = self.registryValue("ducks", currentChannel)
+            huntleader = self.huntleader.get(currentChannel)
+            if huntleader:
+                winnerscore, winnernick = huntleader
             else:
-                maxShoots = 10
-
+                winnernick, winnerscore = max(
+                    scores.items(),
+                    key=BY_VALUE_NICK,
+                )
             # Is there a perfect?
             if winnerscore == maxShoots:
                 irc.reply(
@@ -1199,45 +1411,32 @@ class DuckHunt(callbacks.Plugin):
                     % (winnernick, winnerscore, maxShoots, self.perfectbonus),
                     prefixNick=False,
                 )
-                self.scores[currentChannel][winnernick] += self.perfectbonus
+                scores[winnernick] += self.perfectbonus
             else:
                 # Showing scores
                 # irc.reply("Winner: %s with %i points" % (winnernick, winnerscore))
                 # irc.reply(self.scores.get(currentChannel))
-                reply = []
-                for nick, score in sorted(
-                    iter(self.scores.get(currentChannel).items()),
-                    key=itemgetter(1),
-                    reverse=True,
-                ):
-                    reply.append("({0}: {1})".format(nick, score))
-                irc.reply(
-                    "Scores: "
-                    + str(reply)
-                    .replace("[", "")
-                    .replace("]", "")
-                    .replace(",", "")
-                    .replace("'", ""),
-                    prefixNick=False,
+                reply = " ".join(
+                    "({0}: {1})".format(nick, score)
+                    for nick, score in sorted(scores.items(), key=BY_VALUE, reverse=True)
                 )
+                irc.reply("Scores: " + reply, prefixNick=False)
 
             # Getting channel best time (to see if the best time of this hunt is better)
             channelbestnick = None
             channelbesttime = None
-            if self.channeltimes.get(currentChannel):
+            channeltimes = self.channeltimes.get(currentChannel)
+            if channeltimes:
                 channelbestnick, channelbesttime = min(
-                    iter(self.channeltimes.get(currentChannel).items()),
-                    key=lambda k_v5: (k_v5[1], k_v5[0]),
+                    channeltimes.items(),
+                    key=BY_VALUE_NICK,
                 )
 
             # Showing best time
-            recordmsg = ""
-            try:
-                if self.toptimes.get(currentChannel):
-                    key, value = min(
-                        iter(self.toptimes.get(currentChannel).items()),
-                        key=lambda k_v6: (k_v6[1], k_v6[0]),
-                    )
+            toptimes = self.toptimes.get(currentChannel)
+            if toptimes:
+                key, value = min(toptimes.items(), key=BY_VALUE_NICK)
+                recordmsg = ""
                 if channelbesttime and value < channelbesttime:
                     recordmsg = (
                         ". 🏆 This is the new record for this channel! (previous record"
@@ -1247,41 +1446,33 @@ class DuckHunt(callbacks.Plugin):
                         + str(round(channelbesttime, 2))
                         + " seconds)"
                     )
-                else:
-                    try:
-                        if value < self.channeltimes[currentChannel][key]:
-                            recordmsg = (
-                                " (this is your new record in this channel! 🏆 Your"
-                                " previous record was "
-                                + str(round(self.channeltimes[currentChannel][key], 2))
-                                + ")"
-                            )
-                    except:
-                        recordmsg = ""
+                elif channeltimes and key in channeltimes and value < channeltimes[key]:
+                    recordmsg = (
+                        " (this is your new record in this channel! 🏆 Your"
+                        " previous record was "
+                        + str(round(channeltimes[key], 2))
+                        + ")"
+                    )
                 irc.reply(
                     "🕒 Best time: %s with %.2f seconds%s" % (key, value, recordmsg),
                     prefixNick=False,
                 )
-            except:
-                recordmsg = ""
 
             # Getting channel worst time (to see if the worst time of this hunt is worst)
             channelworstnick = None
             channelworsttime = None
-            if self.channelworsttimes.get(currentChannel):
+            channelworsttimes = self.channelworsttimes.get(currentChannel)
+            if channelworsttimes:
                 channelworstnick, channelworsttime = max(
-                    iter(self.channelworsttimes.get(currentChannel).items()),
-                    key=lambda k_v7: (k_v7[1], k_v7[0]),
+                    channelworsttimes.items(),
+                    key=BY_VALUE_NICK,
                 )
 
             # Showing worst time
-            recordmsg = ""
-            try:
-                if self.worsttimes.get(currentChannel):
-                    key, value = max(
-                        iter(self.worsttimes.get(currentChannel).items()),
-                        key=lambda k_v8: (k_v8[1], k_v8[0]),
-                    )
+            worsttimes = self.worsttimes.get(currentChannel)
+            if worsttimes:
+                key, value = max(worsttimes.items(), key=BY_VALUE_NICK)
+                recordmsg = ""
                 if channelworsttime and value > channelworsttime:
                     recordmsg = (
                         ". 🕒 This is the new longest time for this channel! (previous"
@@ -1291,30 +1482,24 @@ class DuckHunt(callbacks.Plugin):
                         + str(round(channelworsttime, 2))
                         + " seconds)"
                     )
-                else:
-                    try:
-                        if value > self.channelworsttimes[currentChannel][key]:
-                            recordmsg = (
-                                " (this is your new longest time in this channel! 🕒 Your"
-                                " previous longest time was "
-                                + str(
-                                    round(
-                                        self.channelworsttimes[currentChannel][key], 2
-                                    )
-                                )
-                                + ")"
-                            )
-                    except:
-                        recordmsg = ""
-            except:
-                recordmsg = ""
+                elif (
+                    channelworsttimes
+                    and key in channelworsttimes
+                    and value > channelworsttimes[key]
+                ):
+                    recordmsg = (
+                        " (this is your new longest time in this channel! 🕒 Your"
+                        " previous longest time was "
+                        + str(round(channelworsttimes[key], 2))
+                        + ")"
+                    )
 
-            # Only display worst time if something new
-            if recordmsg != "":
-                irc.reply(
-                    "🕒 Longest time: %s with %.2f seconds%s" % (key, value, recordmsg),
-                    prefixNick=False,
-                )
+                # Only display worst time if something new
+                if recordmsg != "":
+                    irc.reply(
+                        "🕒 Longest time: %s with %.2f seconds%s" % (key, value, recordmsg),
+                        prefixNick=False,
+                    )
 
             # Showing average shooting time:
             # if (self.shoots[currentChannel] > 1):
@@ -1322,57 +1507,46 @@ class DuckHunt(callbacks.Plugin):
 
             # Write the scores and times to disk
             self._calc_scores(currentChannel)
-            self._write_scores(currentChannel)
+            self._mark_dirty(currentChannel)
 
             # Did someone took the lead?
-            weekscores = {}
-            if self.channelweek.get(currentChannel):
-                if self.channelweek[currentChannel].get(self.woy):
-                    # for each day of week
-                    for i in (1, 2, 3, 4, 5, 6, 7):
-                        if self.channelweek[currentChannel][self.woy].get(i):
-                            # Getting all scores, to get the winner of the week
-                            for i, players in self.channelweek[currentChannel][
-                                self.woy
-                            ].items():
-                                for player, value in players.items():
-                                    weekscores.setdefault(player, 0)
-                                    weekscores[player] += value
-                            winnernick, winnerscore = max(
-                                iter(weekscores.items()),
-                                key=lambda k_v3: (k_v3[1], k_v3[0]),
-                            )
-                            if winnernick != self.leader[currentChannel]:
-                                if self.leader[currentChannel] != None:
-                                    irc.reply(
-                                        "%s took the lead for the week over %s with %i"
-                                        " points. 🏆"
-                                        % (
-                                            winnernick,
-                                            self.leader[currentChannel],
-                                            winnerscore,
-                                        ),
-                                        prefixNick=False,
-                                    )
-                                else:
-                                    irc.reply(
-                                        "%s has the lead for the week with %i points. 🏆"
-                                        % (winnernick, winnerscore),
-                                        prefixNick=False,
-                                    )
-                                self.leader[currentChannel] = winnernick
+            weektotals = self._week_totals(currentChannel, self._now_dwy()[1])
+
+            if weektotals:
+                winnernick, winnerscore = max(
+                    weektotals.items(),
+                    key=BY_VALUE_NICK,
+                )
+                previousleader = self.leader[currentChannel]
+                if winnernick != previousleader:
+                    if previousleader != None:
+                        irc.reply(
+                            "%s took the lead for the week over %s with %i"
+                            " points. 🏆"
+                            % (
+                                winnernick,
+                                previousleader,
+                                winnerscore,
+                            ),
+                            prefixNick=False,
+                        )
+                    else:
+                        irc.reply(
+                            "%s has the lead for the week with %i points. 🏆"
+                            % (winnernick, winnerscore),
+                            prefixNick=False,
+                        )
+                    self.leader[currentChannel] = winnernick
         else:
             irc.reply("❗😮 Not a single duck was shot during this hunt!", prefixNick=False)
 
         # Reinit current hunt scores
-        if self.scores.get(currentChannel):
-            self.scores[currentChannel] = {}
+        self.scores[currentChannel] = {}
+        self.huntleader[currentChannel] = None
 
         # Reinit current hunt times
-        if self.toptimes.get(currentChannel):
-            self.toptimes[currentChannel] = {}
-        if self.worsttimes.get(currentChannel):
-            self.worsttimes[currentChannel] = {}
+        self.toptimes[currentChannel] = {}
+        self.worsttimes[currentChannel] = {}
 
         # No duck lauched
         self.duck[currentChannel] = False
@@ -1396,7 +1570,7 @@ class DuckHunt(callbacks.Plugin):
                     self.duck[currentChannel] = True
 
                     # Send message directly (instead of queuing it with irc.reply)
-                    irc.sendMsg(ircmsgs.privmsg(currentChannel, "🌳🌳🌳 •*´¨`*•.¸¸.•*´¨`*•.¸¸.••*´¨`*•.¸¸ 🦆 QUACK!"))
+                    irc.sendMsg(ircmsgs.privmsg(currentChannel, QUACK))
 
                     # Define a new throttle[currentChannel] for the next launch
                     self.throttle[currentChannel] = random.randint(
@@ -1404,10 +1578,7 @@ class DuckHunt(callbacks.Plugin):
                         self.maxthrottle[currentChannel],
                     )
 
-                    try:
-                        self.shoots[currentChannel] += 1
-                    except:
-                        self.shoots[currentChannel] = 1
+                    self.shoots[currentChannel] = self.shoots.get(currentChannel, 0) + 1
                 else:
 
                     irc.reply("Already a duck")
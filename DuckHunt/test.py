@@ -29,20 +29,276 @@
 ###
 
 from supybot.test import *
+import supybot.schedule as schedule
+import datetime, os, pickle, time
+
 
 class DuckHuntTestCase(ChannelPluginTestCase):
     plugins = ('DuckHunt',)
 
+    def _cb(self):
+        return self.irc.getCallback('DuckHunt')
+
+    def _file(self, suffix):
+        cb = self._cb()
+        return cb.path.dirize(cb.fileprefix + self.channel + suffix)
+
+    def _dump(self, suffix, data):
+        with open(self._file(suffix), 'wb') as f:
+            pickle.dump(data, f)
+
+    def _flush(self):
+        cb = self._cb()
+        try:
+            schedule.removeEvent('DuckHunt_flush')
+        except KeyError:
+            pass
+        cb._flush_all()
+        cb.writeq.join()
+
+    def _forget(self):
+        # Drop what's saved and loaded, so the next command reads the files
+        # written by the test
+        cb = self._cb()
+        cb.loaded.discard(self.channel)
+        for table in (cb.channelscores, cb.channeltimes,
+                      cb.channelworsttimes, cb.channelweek, cb.weekyear,
+                      cb.weektotals, cb.leaderboards):
+            table.pop(self.channel, None)
+        year = cb._now_dwy()[2]
+        for suffix in ('.state', '.state.corrupt', '.scores', '.times', '.worsttimes',
+                       year + '.weekscores'):
+            if os.path.exists(self._file(suffix)):
+                os.remove(self._file(suffix))
+
+    def _wait(self):
+        # Commands run in threads: once the lock is free, the last one is
+        # done, and all of its replies can be taken
+        with self._cb()._lock(self.channel):
+            pass
+        replies = []
+        msg = self.irc.takeMsg()
+        while msg:
+            replies.append(msg.args[1])
+            msg = self.irc.takeMsg()
+        return replies
+
+    def _start(self, ducks):
+        cb = self._cb()
+        plugin = conf.supybot.plugins.DuckHunt
+        plugin.ducks.setValue(ducks)
+        plugin.missProbability.setValue(1e-9)
+        plugin.kickMode.setValue(False)
+        plugin.autoRestart.setValue(False)
+        self.assertNotError("starthunt")
+        cb.reloadtime[self.channel] = 0
+
+    def _shoot(self, nick, duck):
+        """Shoots, once a duck is launched if duck is true. Returns the
+        replies."""
+        if duck:
+            self._cb()._launch(self.irc, ircmsgs.privmsg(self.channel, "x"), "")
+            self._wait()
+        msg = self.getMsg("bang", frm=nick + "!user@host.com")
+        return [msg.args[1]] + self._wait()
+
+    def _hunt(self, *shots):
+        """Plays a hunt: each shot is (nick, whether there's a duck). The
+        hunt ends with the last duck. Returns the replies to the last shot."""
+        self._start(sum(1 for nick, duck in shots if duck))
+        for nick, duck in shots:
+            replies = self._shoot(nick, duck)
+        return replies
+
+    def _launch_time(self):
+        times = [event[0] for event in schedule.schedule.schedule
+                 if event[1] == "DuckHunt_" + self.channel]
+        self.assertLessEqual(len(times), 1)
+        return times[0] if times else None
 
     def tests(self):
-	self.assertResponse("bang", "There is no hunt right now! You can start a hunt with the 'start' command")
-	self.assertResponse("stop", "Nothing to stop: there's no hunt right now.")
-	self.assertResponse("start", "The hunt starts now!")
-	self.assertResponse("start", "There is already a hunt right now!")
-	self.assertRegexp("bang", "^There was no duck!")
-	self.assertResponse("stop", "The hunt stops now!")
-	self.assertNotError("listscores")
-	self.assertNotError("weekscores")
+        self.assertRegexp("bang", "There is no hunt right now!")
+        self.assertResponse("stophunt", "❗ Nothing to stop: there's no hunt right now.")
+        self.assertResponse("starthunt", "✔️ The hunt starts now! 🦆🦆🦆")
+        self.assertResponse("starthunt", "✔️ There is already a hunt right now!")
+        self.assertRegexp("bang", "There was no duck!")
+        self.assertResponse("stophunt", "❗ The hunt stops now! ❗")
+        self.assertNotError("listscores")
+        self.assertNotError("weekscores")
+
+    def testPackWeekscores(self):
+        cb = self._cb()
+        weekscores = {
+            1: {1: {'foo': 3, 'bar': -2}, 5: {'bar': 7}},
+            52: {7: {'baz': -40000, 'foo': 1}},
+        }
+        packed = cb._pack_weekscores(weekscores)
+        self.assertEqual(packed['nicks'], ['foo', 'bar', 'baz'])
+        packed = pickle.loads(pickle.dumps(packed))
+        self.assertEqual(cb._unpack_weekscores(packed), weekscores)
+        self.assertEqual(cb._unpack_weekscores(cb._pack_weekscores({})), {})
+
+    def testLegacyFiles(self):
+        cb = self._cb()
+        self._forget()
+        day, week, year = cb._now_dwy()
+        self._dump('.scores', {'foo': 12, 'bar': 3})
+        self._dump('.times', {'foo': 1.5})
+        self._dump('.worsttimes', {'foo': 90.0})
+        self._dump(year + '.weekscores', {week: {day: {'foo': 2}}})
+
+        self.assertResponse("total", "15 🦆 ducks have been shot in #test!")
+        self.assertEqual(cb.channelweek[self.channel], {week: {day: {'foo': 2}}})
+
+        # The next write moves everything to the .state file
+        cb._mark_dirty(self.channel)
+        self._flush()
+        with open(self._file('.state'), 'rb') as f:
+            state = pickle.load(f)
+        self.assertEqual(state['year'], year)
+        self.assertEqual(state['scores'], {'foo': 12, 'bar': 3})
+        self.assertEqual(state['times'], {'foo': 1.5})
+        self.assertEqual(state['worsttimes'], {'foo': 90.0})
+        self.assertEqual(cb._unpack_weekscores(state['packedweekscores']),
+                         {week: {day: {'foo': 2}}})
+
+        # Which is the one read from now on
+        for suffix in ('.scores', '.times', '.worsttimes', year + '.weekscores'):
+            os.remove(self._file(suffix))
+        cb.loaded.discard(self.channel)
+        cb.channelscores.pop(self.channel)
+        self.assertResponse("total", "15 🦆 ducks have been shot in #test!")
+        self._forget()
+
+    def testNewYear(self):
+        cb = self._cb()
+        self._forget()
+        day, week, year = cb._now_dwy()
+        self._dump('.state', {
+            'year': str(int(year) - 1),
+            'scores': {'foo': 4},
+            'times': {},
+            'worsttimes': {},
+            'packedweekscores':
+                cb._pack_weekscores({week: {day: {'foo': 4}}}),
+        })
+
+        # The week scores of last year are gone, the total scores stay
+        self.assertRegexp("weekscores",
+                          "There aren't any week scores for this channel yet")
+        self.assertResponse("total", "4 🦆 ducks have been shot in #test!")
+        self._forget()
+
+    def testNewYearHunt(self):
+        cb = self._cb()
+        self._forget()
+        try:
+            cb._now_dwy = lambda: (3, 1, "2098")
+            self._hunt(("old", True))
+            cb._now_dwy = lambda: (3, 1, "2099")
+            self._hunt(("new", True))
+            self._flush()
+        finally:
+            del cb._now_dwy
+
+        # Last year's week 1 isn't this year's. A single duck shot is a
+        # perfect hunt, hence the bonus.
+        score = 1 + cb.perfectbonus
+        with open(self._file('.state'), 'rb') as f:
+            state = pickle.load(f)
+        self.assertEqual(state['year'], "2099")
+        self.assertEqual(cb._unpack_weekscores(state['packedweekscores']),
+                         {1: {3: {'new': score}}})
+        self.assertEqual(state['scores'], {'old': score, 'new': score})
+        self.assertEqual(cb.leader[self.channel], 'new')
+        self._forget()
+
+    def testHuntLeader(self):
+        cb = self._cb()
+        self._forget()
+        self._start(3)
+        self._shoot("alice", True)
+        self._shoot("bob", True)
+        self.assertEqual(cb.huntleader[self.channel], (1, "bob"))
+
+        # The leader loses a point, the leader is looked for again at the end
+        self._shoot("bob", False)
+        self.assertNotIn(self.channel, cb.huntleader)
+        replies = self._shoot("alice", True)
+        self.assertIn("Scores: (alice: 2) (bob: 0)", replies)
+
+        # A perfect hunt, despite someone else's penalties
+        replies = self._hunt(("carol", False), ("dave", True), ("carol", False),
+                             ("dave", True))
+        self.assertIn("😮 dave: 2 ducks out of 2: perfect!!! +%i 😮"
+                      % cb.perfectbonus, replies)
+        self.assertEqual(cb.channelscores[self.channel]["carol"], -2)
+        self._forget()
+
+    def testLaunchSchedule(self):
+        cb = self._cb()
+        self._forget()
+        self._start(2)
+        when = cb.lastSpoke[self.channel] + cb.throttle[self.channel]
+        self.assertEqual(self._launch_time(), when)
+
+        # Too early, maybe because someone spoke: the launch waits
+        schedule.removeEvent("DuckHunt_" + self.channel)
+        cb.lastSpoke[self.channel] = time.time()
+        cb.launchers[self.channel]()
+        self.assertFalse(cb.duck[self.channel])
+        self.assertEqual(self._launch_time(),
+                         cb.lastSpoke[self.channel] + cb.throttle[self.channel])
+
+        # Time for a duck, and no other launch until it's shot
+        schedule.removeEvent("DuckHunt_" + self.channel)
+        cb.lastSpoke[self.channel] = 0
+        cb.launchers[self.channel]()
+        self._wait()
+        self.assertTrue(cb.duck[self.channel])
+        self.assertIsNone(self._launch_time())
+        self.assertNotError("bang")
+        self._wait()
+        self.assertFalse(cb.duck[self.channel])
+        self.assertEqual(self._launch_time(),
+                         cb.lastSpoke[self.channel] + cb.throttle[self.channel])
+
+        self.assertNotError("stophunt")
+        self.assertIsNone(self._launch_time())
+        self._forget()
+
+    def testHms(self):
+        cb = self._cb()
+        for seconds in (0, 0.4, 59.5, 60, 3599.6, 3600, 86399.4, 86400,
+                        90061.2, 2 * 86400 + 5, 12345678.9):
+            self.assertEqual(cb._hms(seconds),
+                             str(datetime.timedelta(seconds=round(seconds))))
+
+    def testEmptyFile(self):
+        self._forget()
+        with open(self._file('.state'), 'wb'):
+            pass
+        self.assertRegexp("listscores", "There aren't any scores")
+        self._forget()
+
+    def testDamagedFile(self):
+        cb = self._cb()
+        self._forget()
+        with open(self._file('.state'), 'wb') as f:
+            f.write(b'garbage')
+        self._dump('.scores', {'foo': 2})
+
+        # The damaged file is kept aside, and the older files are used
+        self.assertResponse("total", "2 🦆 ducks have been shot in #test!")
+        self.assertFalse(os.path.exists(self._file('.state')))
+        with open(self._file('.state.corrupt'), 'rb') as f:
+            self.assertEqual(f.read(), b'garbage')
+
+        cb._mark_dirty(self.channel)
+        self._flush()
+        with open(self._file('.state.corrupt'), 'rb') as f:
+            self.assertEqual(f.read(), b'garbage')
+        self._forget()
 
 
 # vim:set shiftwidth=4 softtabstop=4 expandtab textwidth=79:
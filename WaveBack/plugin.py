@@ -114,26 +114,26 @@ class WaveBack(callbacks.Plugin):
         """Respond to greetings."""
         try:
             # Log incoming message details for debugging
-            self.log.debug(f"WaveBack: Received message in {msg.args[0]}: {msg.args[1]}")
+            self.log.debug("WaveBack: Received message in %s: %s", msg.args[0], msg.args[1])
 
             # Validate `msg.args` structure to avoid errors
             if not hasattr(msg, 'args') or len(msg.args) < 2:
-                self.log.debug(f"WaveBack: Malformed msg.args: {getattr(msg, 'args', None)}")
+                self.log.debug("WaveBack: Malformed msg.args: %s", getattr(msg, 'args', None))
                 return  # Exit gracefully
 
             channel = msg.args[0]
             message_content = msg.args[1]
 
             # Log the channel and message content
-            self.log.debug(f"WaveBack: Channel: {channel}, Message: {message_content}")
+            self.log.debug("WaveBack: Channel: %s, Message: %s", channel, message_content)
 
             # Ensure the channel is in the enabled list
             if channel in self.enabled_channels:
-                self.log.debug(f"WaveBack: Channel {channel} is enabled")
+                self.log.debug("WaveBack: Channel %s is enabled", channel)
 
                 # Check if message content is a string
                 if isinstance(message_content, str):
-                    self.log.debug(f"WaveBack: Checking message content for greetings...")
+                    self.log.debug("WaveBack: Checking message content for greetings...")
 
                     # Tokenize message into words (case-insensitive)
                     words = re.findall(r'\b\w+\b', message_content.lower())
@@ -141,7 +141,7 @@ class WaveBack(callbacks.Plugin):
                     # Check if any greeting keyword matches
                     for keyword in self.greetings_keywords:
                         if keyword in words:  # Match as whole word only
-                            self.log.debug(f"WaveBack: Found keyword '{keyword}' in message.")
+                            self.log.debug("WaveBack: Found keyword '%s' in message.", keyword)
                             reply = random.choice(self.dynamic_replies)
                             irc.reply(reply)
                             return  # Exit once a reply is sent
@@ -150,10 +150,10 @@ class WaveBack(callbacks.Plugin):
                 else:
                     self.log.debug("WaveBack: Message content is not a string.")
             else:
-                self.log.debug(f"WaveBack: Channel {channel} is not in enabledChannels.")
+                self.log.debug("WaveBack: Channel %s is not in enabledChannels.", channel)
 
         except Exception as e:
-            self.log.error(f"WaveBack: Error in doPrivmsg: {e}")
+            self.log.error("WaveBack: Error in doPrivmsg: %s", e)
 
 # Register the plugin configuration
 conf.registerPlugin('WaveBack')